@@ -1,9 +1,28 @@
 import os
+import gzip
+import json
+import time
+import random
+import hashlib
+import hmac
+import tempfile
+import threading
+from bisect import bisect_left
+from urllib.parse import urlencode, urlsplit
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import OrderedDict, deque
 import requests
+from requests.adapters import HTTPAdapter
 import jwt 
 from flask import Flask, request, jsonify, Response, send_from_directory, g
 from dotenv import load_dotenv
 from flask_cors import CORS
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # brotli opsional; tanpa paket ini hanya gzip yang dipakai
+    brotli = None
 
 load_dotenv()
 
@@ -22,119 +41,1800 @@ PUBLIC_PATHS = [
     '/index.html',            
     '/admin.html',           
     '/api/user/login',
+    '/api/user/refresh',      # Refresh token dipakai saat access token sudah kedaluwarsa
     '/api/user/register',
     '/api/route/routes',
     '/api/stop/stops',
     '/api/bus/buses',
-    '/api/schedule/schedules'
+    '/api/schedule/schedules',
+    '/api/batch'              # Auth diperiksa per sub-request di batch_requests()
 ]
 
+def _parse_service_urls(value):
+    """'http://a:5004, http://b:5004' -> ['http://a:5004', 'http://b:5004']"""
+    return [url.strip().rstrip('/') for url in (value or '').split(',') if url.strip()]
+
+
+# Setiap service bisa punya beberapa replika (URL dipisah koma di env)
 SERVICE_URLS = {
-    "user": os.environ.get("USER_SERVICE_URL"),      # http://service-user:5001
-    "route": os.environ.get("ROUTE_SERVICE_URL"),     # http://service-1-route:5002
-    "stop": os.environ.get("STOP_SERVICE_URL"),       # http://service-2-stop:5003
-    "bus": os.environ.get("BUS_SERVICE_URL"),         # http://service-3-bus:5004
-    "schedule": os.environ.get("SCHEDULE_SERVICE_URL")# http://service-4-schedule:5005
+    "user": _parse_service_urls(os.environ.get("USER_SERVICE_URL")),          # http://service-user:5001
+    "route": _parse_service_urls(os.environ.get("ROUTE_SERVICE_URL")),        # http://service-1-route:5002
+    "stop": _parse_service_urls(os.environ.get("STOP_SERVICE_URL")),          # http://service-2-stop:5003
+    "bus": _parse_service_urls(os.environ.get("BUS_SERVICE_URL")),            # http://service-3-bus:5004
+    "schedule": _parse_service_urls(os.environ.get("SCHEDULE_SERVICE_URL"))   # http://service-4-schedule:5005
 }
 
-# --- Hook Validasi JWT ---
-@app.before_request
-def require_jwt_authentication():
+# --- Konfigurasi Koneksi ke Service Internal ---
+# Ukuran pool keep-alive per service, bisa di-override per entry SERVICE_URLS
+# lewat <NAMA>_SERVICE_POOL_SIZE (misal: BUS_SERVICE_POOL_SIZE=20)
+UPSTREAM_POOL_SIZE = int(os.environ.get("UPSTREAM_POOL_SIZE", 10))
+SERVICE_POOL_SIZES = {
+    name: int(os.environ.get(f"{name.upper()}_SERVICE_POOL_SIZE", UPSTREAM_POOL_SIZE))
+    for name in SERVICE_URLS
+}
+
+# Timeout dipisah: connect (buka TCP) dan read (menunggu respons)
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT", 3.0))
+UPSTREAM_READ_TIMEOUT = float(os.environ.get("UPSTREAM_READ_TIMEOUT", 10.0))
+
+# Deadline total satu request di belakang gateway. Dikirim ke service sebagai
+# header X-Request-Deadline (epoch milidetik) agar service berhenti bekerja
+# untuk request yang sudah ditinggalkan client.
+DEADLINE_HEADER = 'X-Request-Deadline'
+REQUEST_DEADLINE_SECONDS = float(os.environ.get("REQUEST_DEADLINE_SECONDS", UPSTREAM_READ_TIMEOUT))
+
+
+def request_deadline(client_value=None):
+    """Deadline (epoch detik) untuk request ini; deadline dari client dipakai jika lebih awal."""
+    deadline = time.time() + REQUEST_DEADLINE_SECONDS
+    try:
+        return min(deadline, int(client_value) / 1000.0) if client_value else deadline
+    except ValueError:
+        return deadline
+
+
+def upstream_timeout(deadline):
+    """(connect, read) timeout sesuai sisa waktu sampai deadline, None jika sudah lewat."""
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        return None
+    return min(UPSTREAM_CONNECT_TIMEOUT, remaining), min(UPSTREAM_READ_TIMEOUT, remaining)
+
+
+def _create_service_session(pool_size, replica_count=1):
+    """Membuat session dengan pool koneksi keep-alive (satu pool per replika) untuk satu service."""
+    session = requests.Session()
+    # Header dari client diteruskan apa adanya, jadi jangan tambah header default
+    session.headers.clear()
+    # Jangan ikut proxy dari environment untuk trafik internal antar container
+    session.trust_env = False
+    adapter = HTTPAdapter(pool_connections=max(replica_count, 1), pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+SERVICE_SESSIONS = {
+    name: _create_service_session(SERVICE_POOL_SIZES[name], len(SERVICE_URLS[name]))
+    for name in SERVICE_URLS
+}
+
+# Jumlah request yang sedang menunggu respons dari tiap service
+_in_flight = {name: 0 for name in SERVICE_URLS}
+_in_flight_lock = threading.Lock()
+
+# --- Circuit Breaker & Bulkhead per Service ---
+# Breaker terbuka setelah BREAKER_FAILURE_THRESHOLD kegagalan berturut-turut,
+# lalu setelah BREAKER_RESET_TIMEOUT detik mengizinkan request percobaan (half-open).
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RESET_TIMEOUT = float(os.environ.get("BREAKER_RESET_TIMEOUT", 30.0))
+BREAKER_HALF_OPEN_MAX_CALLS = int(os.environ.get("BREAKER_HALF_OPEN_MAX_CALLS", 1))
+
+# Bulkhead: batas request bersamaan per service (default = ukuran pool), agar
+# satu service yang lambat tidak menghabiskan semua thread/worker gateway.
+SERVICE_MAX_CONCURRENCY = {
+    name: int(os.environ.get(f"{name.upper()}_SERVICE_MAX_CONCURRENCY", SERVICE_POOL_SIZES[name]))
+    for name in SERVICE_URLS
+}
+
+
+class CircuitBreaker:
+    """Circuit breaker sederhana dengan state closed, open, dan half-open."""
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold, reset_timeout, half_open_max_calls):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self.half_open_calls = 0
+            if self.state == self.HALF_OPEN:
+                if self.half_open_calls >= self.half_open_max_calls:
+                    self.rejected += 1
+                    return False
+                self.half_open_calls += 1
+            return True
+
+    def retry_after(self):
+        """Sisa detik sebelum breaker yang terbuka mengizinkan percobaan lagi."""
+        remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+        return max(int(remaining + 0.999), 1)
+
+    def cancel_request(self):
+        """Kembalikan jatah percobaan half-open jika request batal dikirim."""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self.half_open_calls > 0:
+                self.half_open_calls -= 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "consecutiveFailures": self.failures,
+            "failureThreshold": self.failure_threshold,
+            "resetTimeout": self.reset_timeout,
+            "timesOpened": self.times_opened,
+            "rejected": self.rejected,
+            "retryAfter": self.retry_after() if self.state == self.OPEN else None,
+        }
+
+
+SERVICE_BREAKERS = {
+    name: CircuitBreaker(name, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT, BREAKER_HALF_OPEN_MAX_CALLS)
+    for name in SERVICE_URLS
+}
+SERVICE_BULKHEADS = {
+    name: threading.BoundedSemaphore(SERVICE_MAX_CONCURRENCY[name])
+    for name in SERVICE_URLS
+}
+_bulkhead_rejected = {name: 0 for name in SERVICE_URLS}
+
+
+def _acquire_slot(service_name):
+    """Ambil slot bulkhead tanpa menunggu. False jika service sudah penuh."""
+    if not SERVICE_BULKHEADS[service_name].acquire(blocking=False):
+        with _in_flight_lock:
+            _bulkhead_rejected[service_name] += 1
+        return False
+    with _in_flight_lock:
+        _in_flight[service_name] += 1
+    return True
+
+
+def _release_slot(service_name):
+    with _in_flight_lock:
+        _in_flight[service_name] -= 1
+    SERVICE_BULKHEADS[service_name].release()
+
+
+def get_breaker_stats():
+    return {
+        name: dict(
+            breaker.snapshot(),
+            inFlight=_in_flight[name],
+            maxConcurrency=SERVICE_MAX_CONCURRENCY[name],
+            bulkheadRejected=_bulkhead_rejected[name],
+            replicas=SERVICE_REPLICAS[name].snapshot(),
+        )
+        for name, breaker in SERVICE_BREAKERS.items()
+    }
+
+
+# --- Load Balancing antar Replika ---
+# Replika dipilih berdasarkan request berjalan paling sedikit. Replika yang
+# gagal REPLICA_EJECT_THRESHOLD kali berturut-turut dikeluarkan sementara, lalu
+# dicek ulang lewat GET /health sebelum dipakai lagi.
+REPLICA_EJECT_THRESHOLD = int(os.environ.get("REPLICA_EJECT_THRESHOLD", 3))
+REPLICA_EJECT_SECONDS = float(os.environ.get("REPLICA_EJECT_SECONDS", 10.0))
+REPLICA_PROBE_INTERVAL = float(os.environ.get("REPLICA_PROBE_INTERVAL", 2.0))
+REPLICA_PROBE_PATH = os.environ.get("REPLICA_PROBE_PATH", "/health")
+
+
+class Replica:
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+
+    @property
+    def ejected(self):
+        return self.ejected_until > 0
+
+    def snapshot(self):
+        return {
+            "url": self.url,
+            "healthy": not self.ejected,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+        }
+
+
+class ReplicaSet:
+    """Kumpulan replika satu service dengan pemilihan least-outstanding-requests."""
+    def __init__(self, service_name, urls):
+        self.service_name = service_name
+        self.replicas = [Replica(url) for url in urls]
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def acquire(self, exclude=()):
+        """Pilih replika (sebisa mungkin di luar exclude) dan tandai satu request berjalan."""
+        with self._lock:
+            # Jika semua replika sudah dicoba, pakai lagi (koneksi lain ke replika yang sama)
+            candidates = [r for r in self.replicas if r not in exclude] or list(self.replicas)
+            healthy = [r for r in candidates if not r.ejected]
+            # Jika semua replika sedang dikeluarkan, tetap coba daripada gagal total
+            candidates = healthy or candidates
+            # Rotasi titik mulai agar replika dengan beban sama dipakai bergantian
+            self._next = (self._next + 1) % len(candidates)
+            rotated = candidates[self._next:] + candidates[:self._next]
+            replica = min(rotated, key=lambda r: r.outstanding)
+            replica.outstanding += 1
+            replica.requests += 1
+            return replica
+
+    def release(self, replica, success):
+        with self._lock:
+            replica.outstanding -= 1
+            if success:
+                replica.consecutive_failures = 0
+                return
+            replica.failures += 1
+            replica.consecutive_failures += 1
+            if (not replica.ejected and len(self.replicas) > 1
+                    and replica.consecutive_failures >= REPLICA_EJECT_THRESHOLD):
+                replica.ejected_until = time.monotonic() + REPLICA_EJECT_SECONDS
+                replica.ejections += 1
+                _start_replica_prober()
+
+    def probe_due(self):
+        """Replika yang masa ejeksinya sudah habis dan perlu dicek ulang."""
+        now = time.monotonic()
+        with self._lock:
+            return [r for r in self.replicas if r.ejected and r.ejected_until <= now]
+
+    def mark_probe_result(self, replica, healthy):
+        with self._lock:
+            if healthy:
+                replica.ejected_until = 0.0
+                replica.consecutive_failures = 0
+            else:
+                replica.ejected_until = time.monotonic() + REPLICA_EJECT_SECONDS
+
+    def snapshot(self):
+        with self._lock:
+            return [r.snapshot() for r in self.replicas]
+
+
+SERVICE_REPLICAS = {name: ReplicaSet(name, urls) for name, urls in SERVICE_URLS.items()}
+
+_prober_started = False
+_prober_lock = threading.Lock()
+
+
+def _probe_replicas_forever():
+    while True:
+        time.sleep(REPLICA_PROBE_INTERVAL)
+        for name, replica_set in SERVICE_REPLICAS.items():
+            for replica in replica_set.probe_due():
+                try:
+                    resp = SERVICE_SESSIONS[name].get(
+                        f"{replica.url}{REPLICA_PROBE_PATH}",
+                        timeout=(UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_CONNECT_TIMEOUT)
+                    )
+                    healthy = resp.status_code < 500
+                except requests.exceptions.RequestException:
+                    healthy = False
+                replica_set.mark_probe_result(replica, healthy)
+
+
+def _start_replica_prober():
+    """Thread probe dijalankan saat pertama kali ada replika yang dikeluarkan (per worker)."""
+    global _prober_started
+    with _prober_lock:
+        if _prober_started:
+            return
+        _prober_started = True
+    threading.Thread(target=_probe_replicas_forever, name="replica-prober", daemon=True).start()
+
+
+def get_pool_stats():
     """
-    Hook ini berjalan sebelum SETIAP request.
+    Statistik pemakaian pool koneksi per service (per worker gunicorn).
+    Dipakai untuk menyesuaikan jumlah worker dengan ukuran pool.
     """
-    # 1. Cek apakah path request ada di daftar publik
-    if request.path in PUBLIC_PATHS:
-        return  # Lewati pemeriksaan, lanjutkan ke rute
+    stats = {}
+    for name, session in SERVICE_SESSIONS.items():
+        adapter = session.get_adapter("http://")
+        hosts = []
+        for key in adapter.poolmanager.pools.keys():
+            pool = adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+            hosts.append({
+                "host": f"{pool.host}:{pool.port}",
+                "connectionsOpened": pool.num_connections,
+                "requestsSent": pool.num_requests,
+                "idle": idle,
+            })
+        stats[name] = {
+            "poolSize": SERVICE_POOL_SIZES[name],
+            "inFlight": _in_flight[name],
+            "hosts": hosts,
+        }
+    return {"pid": os.getpid(), "services": stats}
 
-    # 2. Dapatkan dan validasi token JWT
-    auth_header = request.headers.get('Authorization')
+# --- Metrics (format teks Prometheus) ---
+# Catatan: setiap worker gunicorn punya metrics sendiri; jalankan 1 worker
+# dengan banyak thread (--threads) jika angka per proses ingin utuh.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    """
+    Counter dan histogram yang di-shard per thread. Setiap thread hanya menulis
+    ke dict miliknya sendiri (tanpa lock); saat scrape semua shard dijumlahkan.
+    Lock hanya dipakai sekali ketika sebuah thread pertama kali mencatat.
+    Shard milik thread yang sudah selesai (misal worker executor /api/batch)
+    digabung ke total bersama lalu dibuang, jadi jumlah shard mengikuti
+    jumlah thread yang masih hidup.
+    """
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards = []                  # [(thread, (counters, histograms))]
+        self._retired = ({}, {})           # total dari thread yang sudah selesai
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = ({}, {})   # (counters, histograms)
+            with self._shards_lock:
+                self._retire_dead_shards()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _merge(self, target, shard):
+        counters, histograms = target
+        shard_counters, shard_histograms = shard
+        for key, value in dict(shard_counters).items():
+            counters[key] = counters.get(key, 0) + value
+        for key, hist in dict(shard_histograms).items():
+            total = histograms.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, value in enumerate(list(hist)):
+                total[i] += value
+
+    def _retire_dead_shards(self):
+        """Pindahkan shard thread yang sudah mati ke total bersama (dipanggil dengan lock)."""
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                # Thread sudah selesai, shard-nya tidak akan ditulis lagi
+                self._merge(self._retired, shard)
+        self._shards = alive
+
+    def inc(self, name, labels, value=1):
+        counters = self._shard()[0]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels, seconds):
+        histograms = self._shard()[1]
+        key = (name, labels)
+        hist = histograms.get(key)
+        if hist is None:
+            # [jumlah per bucket ..., jumlah +Inf, total detik]
+            hist = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        hist[bisect_left(self.buckets, seconds)] += 1
+        hist[-1] += seconds
+
+    def collect(self):
+        """Gabungan semua shard: (counters, histograms)."""
+        result = ({}, {})
+        with self._shards_lock:
+            self._retire_dead_shards()
+            self._merge(result, self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            self._merge(result, shard)
+        return result
+
+    def shard_count(self):
+        with self._shards_lock:
+            return len(self._shards)
+
+
+metrics = Metrics(LATENCY_BUCKETS)
+
+METRIC_HELP = {
+    'gateway_requests_total': ('counter', 'Jumlah request ke gateway per service, route, method, dan status.'),
+    'gateway_request_duration_seconds': ('histogram', 'Total waktu proses request di gateway.'),
+    'gateway_jwt_validation_seconds': ('histogram', 'Waktu validasi JWT per request.'),
+    'gateway_upstream_duration_seconds': ('histogram', 'Waktu menunggu respons service internal.'),
+    'gateway_upstream_errors_total': ('counter', 'Kegagalan panggilan ke service internal per jenis.'),
+    'gateway_upstream_retries_total': ('counter', 'Retry GET setelah gagal koneksi ke service internal.'),
+    'gateway_upstream_hedges_total': ('counter', 'Request hedge yang dikirim dan hasilnya (won/lost).'),
+    'gateway_retry_budget_exhausted_total': ('counter', 'Retry/hedge yang dibatalkan karena budget habis.'),
+}
+
+
+def _metric_labels(service, route, method=None):
+    return (('service', service), ('route', route)) + ((('method', method),) if method else ())
+
+
+_ROUTE_SEGMENT_MAX_LENGTH = 32
+
+
+def _route_label(path, status_code=None):
+    """
+    Normalisasi path untuk label route agar jumlah series tetap kecil:
+    request yang tidak cocok dengan rute mana pun (404) diberi label
+    'unmatched', segmen angka menjadi ':id', segmen yang bukan nama
+    resource biasa menjadi ':param', dan kedalaman dibatasi.
+    """
+    if request.url_rule is None or status_code == 404:
+        return 'unmatched'
+    if not path.startswith('/api/'):
+        return request.url_rule.rule
+    return normalize_api_path(path)
+
+
+def normalize_api_path(path):
+    """Path /api/ dengan id/parameter diganti placeholder (dipakai juga oleh asgi.py)."""
+    segments = []
+    for segment in path.strip('/').split('/')[:5]:
+        if segment.isdigit():
+            segment = ':id'
+        elif (len(segment) > _ROUTE_SEGMENT_MAX_LENGTH
+              or not (segment.isascii() and segment.replace('-', '').replace('_', '').isalpha())):
+            segment = ':param'
+        segments.append(segment)
+    return '/' + '/'.join(segments)
+
+
+def _service_label(path):
+    parts = path.split('/', 3)
+    if len(parts) >= 3 and parts[1] == 'api' and parts[2] in SERVICE_URLS:
+        return parts[2]
+    return 'gateway'
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        labels = _metric_labels(_service_label(request.path),
+                                _route_label(request.path, response.status_code))
+        metrics.inc('gateway_requests_total', labels + (('method', request.method), ('status', str(response.status_code))))
+        metrics.observe('gateway_request_duration_seconds', labels, time.perf_counter() - started)
+    return response
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_label(v)}"' for k, v in labels) + '}'
+
+
+def render_metrics():
+    """Render semua metrics gateway dalam format eksposisi teks Prometheus."""
+    counters, histograms = metrics.collect()
+    lines = []
+
+    def header(name, metric_type, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+
+    for name, (metric_type, help_text) in METRIC_HELP.items():
+        header(name, metric_type, help_text)
+        if metric_type == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+        else:
+            for (metric, labels), hist in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), hist[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", str(bound)),))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {hist[-1]:.6f}')
+                lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+
+    # Gauge & counter yang dibaca langsung dari komponen gateway
+    admission = admission_limiter.snapshot()
+    header('gateway_admission_limit', 'gauge', 'Limit konkurensi adaptif admission control.')
+    lines.append(f'gateway_admission_limit {admission["limit"]}')
+    header('gateway_admission_in_flight', 'gauge', 'Request /api/ yang sedang diproses.')
+    lines.append(f'gateway_admission_in_flight {admission["inFlight"]}')
+    header('gateway_shed_requests_total', 'counter', 'Request yang ditolak admission control per prioritas.')
+    for priority, value in admission['shed'].items():
+        lines.append(f'gateway_shed_requests_total{{priority="{priority}"}} {value}')
+
+    header('gateway_upstream_in_flight', 'gauge', 'Request yang sedang menunggu service internal.')
+    for name in SERVICE_URLS:
+        lines.append(f'gateway_upstream_in_flight{{service="{name}"}} {_in_flight[name]}')
+
+    header('gateway_circuit_breaker_open', 'gauge', 'State breaker (0=closed, 1=half-open, 2=open).')
+    state_values = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+    for name, breaker in SERVICE_BREAKERS.items():
+        lines.append(f'gateway_circuit_breaker_open{{service="{name}"}} {state_values[breaker.state]}')
+
+    replicas = [
+        (_format_labels((('service', name), ('replica', replica['url']))), replica)
+        for name, replica_set in SERVICE_REPLICAS.items()
+        for replica in replica_set.snapshot()
+    ]
+    header('gateway_replica_healthy', 'gauge', 'Replika yang sedang dipakai (1) atau dikeluarkan (0).')
+    for labels, replica in replicas:
+        lines.append(f'gateway_replica_healthy{labels} {int(replica["healthy"])}')
+    header('gateway_replica_outstanding_requests', 'gauge', 'Request berjalan per replika.')
+    for labels, replica in replicas:
+        lines.append(f'gateway_replica_outstanding_requests{labels} {replica["outstanding"]}')
+
+    pools = get_pool_stats()['services']
+    header('gateway_pool_idle_connections', 'gauge', 'Koneksi keep-alive idle di pool per service.')
+    for name, pool in pools.items():
+        lines.append(f'gateway_pool_idle_connections{{service="{name}"}} {sum(h["idle"] for h in pool["hosts"])}')
+    header('gateway_pool_connections_opened_total', 'counter', 'Koneksi TCP baru yang dibuka ke service.')
+    for name, pool in pools.items():
+        lines.append(f'gateway_pool_connections_opened_total{{service="{name}"}} {sum(h["connectionsOpened"] for h in pool["hosts"])}')
+
+    cache = response_cache.stats()
+    jwt_stats = token_cache.stats()
+    coalescing = single_flight.stats()
+    for name, metric_type, help_text, value in [
+        ('gateway_response_cache_hits_total', 'counter', 'Hit cache respons.', cache['hits']),
+        ('gateway_response_cache_misses_total', 'counter', 'Miss cache respons.', cache['misses']),
+        ('gateway_response_cache_bytes', 'gauge', 'Ukuran cache respons (byte).', cache['bytes']),
+        ('gateway_jwt_cache_hits_total', 'counter', 'Hit cache verifikasi JWT.', jwt_stats['hits']),
+        ('gateway_jwt_cache_misses_total', 'counter', 'Miss cache verifikasi JWT.', jwt_stats['misses']),
+        ('gateway_coalesced_requests_total', 'counter', 'GET yang memakai hasil panggilan lain.', coalescing['coalesced']),
+    ]:
+        header(name, metric_type, help_text)
+        lines.append(f'{name} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+
+# --- Cache Hasil Verifikasi JWT ---
+# Token yang sama dipakai berulang kali selama masa berlakunya, jadi payload
+# hasil decode disimpan agar verifikasi signature tidak diulang tiap request.
+JWT_CACHE_MAX_ENTRIES = int(os.environ.get("JWT_CACHE_MAX_ENTRIES", 10000))
+# Batas umur entry di cache; setelah itu token di-decode ulang
+JWT_CACHE_MAX_TTL = int(os.environ.get("JWT_CACHE_MAX_TTL", 300))
+
+
+class TokenCache:
+    """Cache LRU token -> payload yang menghormati klaim exp."""
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # token -> (evict_at, exp, payload)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.decode_seconds = 0.0
+
+    def get(self, token):
+        """
+        Return payload, atau None jika tidak ada di cache (termasuk entry yang
+        umur cache-nya habis; token akan di-decode ulang). Raise
+        ExpiredSignatureError hanya jika klaim exp token sudah lewat.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            evict_at, exp, payload = entry
+            if exp is not None and exp <= now:
+                del self._entries[token]
+                self.expired += 1
+                raise jwt.ExpiredSignatureError("Signature has expired")
+            if evict_at <= now:
+                del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return payload
+
+    def peek(self, token):
+        """Payload token yang sudah terverifikasi dan masih berlaku, tanpa decode dan statistik."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+        if entry is None:
+            return None
+        evict_at, exp, payload = entry
+        if evict_at <= now or (exp is not None and exp <= now):
+            return None
+        return payload
+
+    def set(self, token, payload, decode_seconds):
+        exp = payload.get('exp') if isinstance(payload.get('exp'), (int, float)) else None
+        evict_at = time.time() + JWT_CACHE_MAX_TTL
+        if exp is not None:
+            evict_at = min(evict_at, exp)
+        with self._lock:
+            self.decode_seconds += decode_seconds
+            self._entries[token] = (evict_at, exp, payload)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        avg_decode = self.decode_seconds / self.misses if self.misses else 0.0
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "avgDecodeMicros": round(avg_decode * 1e6, 2),
+            # Perkiraan waktu CPU yang dihemat: hit * rata-rata biaya decode
+            "cpuSecondsSaved": round(self.hits * avg_decode, 6),
+        }
+
+
+token_cache = TokenCache(JWT_CACHE_MAX_ENTRIES)
+
+
+def decode_token(token):
+    """jwt.decode dengan cache payload; exception sama dengan jwt.decode."""
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    start = time.perf_counter()
+    payload = jwt.decode(
+        token,
+        app.config['JWT_SECRET_KEY'],
+        algorithms=['HS256']
+    )
+    token_cache.set(token, payload, time.perf_counter() - start)
+    return payload
+
+
+# --- Validasi JWT ---
+def verify_auth_header(auth_header):
+    """
+    Validasi header 'Authorization: Bearer <token>'.
+    Return: (payload, None) jika valid, atau (None, (body_error, status_code)).
+    """
     if not auth_header:
-        return jsonify({"error": "Authorization header is missing"}), 401
+        return None, ({"error": "Authorization header is missing"}, 401)
 
     try:
         parts = auth_header.split()
-        if parts[0].lower() != 'bearer' or len(parts) != 2:
+        if len(parts) != 2 or parts[0].lower() != 'bearer':
             raise ValueError("Format header Authorization tidak valid")
 
         token = parts[1]
-        payload = jwt.decode(
-            token,
-            app.config['JWT_SECRET_KEY'],
-            algorithms=['HS256']
-        )
-        g.user_payload = payload
+        payload = decode_token(token)
 
     except jwt.ExpiredSignatureError:
-        return jsonify({"error": "Token has expired"}), 401
+        return None, ({"error": "Token has expired"}, 401)
     except (jwt.InvalidTokenError, ValueError) as e:
-        return jsonify({"error": "Invalid token", "details": str(e)}), 401
+        return None, ({"error": "Invalid token", "details": str(e)}, 401)
+    return payload, None
+
+
+# Endpoint internal gateway (pool, replika, cache) hanya untuk admin, sama
+# seperti /gateway/admin/breakers. Scraper metrics bisa memakai token
+# statis METRICS_SCRAPE_TOKEN sebagai Bearer token (kosong = nonaktif).
+INTERNAL_PATHS = ('/gateway/stats', '/metrics')
+METRICS_SCRAPE_TOKEN = os.environ.get("METRICS_SCRAPE_TOKEN", "")
+
+
+def is_scrape_request(path, auth_header):
+    """True jika request ke endpoint internal membawa METRICS_SCRAPE_TOKEN yang benar."""
+    if not METRICS_SCRAPE_TOKEN or path not in INTERNAL_PATHS or not auth_header:
+        return False
+    parts = auth_header.split()
+    return (len(parts) == 2 and parts[0].lower() == 'bearer'
+            and hmac.compare_digest(parts[1], METRICS_SCRAPE_TOKEN))
+
+
+def check_admin_role(path, payload):
+    """Path yang mengandung '/admin' dan endpoint internal hanya untuk role admin. Return error atau None."""
+    if path in INTERNAL_PATHS or ('/admin' in path and path != '/admin.html'):
+        if payload.get('role') != 'admin':
+            return {"error": "Admin access required for this resource"}, 403
+    return None
+
+
+def authenticate_request(path, auth_header):
+    """
+    Memeriksa aturan akses (PUBLIC_PATHS, JWT, role admin) untuk sebuah path.
+    Return: (payload, None) jika lolos, atau (None, (body_error, status_code)).
+    Dipakai bersama oleh hook Flask dan gateway mode ASGI.
+    """
+    # 1. Cek apakah path request ada di daftar publik
+    if path in PUBLIC_PATHS or is_scrape_request(path, auth_header):
+        return None, None  # Lewati pemeriksaan, lanjutkan ke rute
+
+    # 2. Dapatkan dan validasi token JWT
+    payload, error = verify_auth_header(auth_header)
+    if error:
+        return None, error
 
     # 3. Validasi Role Admin
-    if '/admin' in request.path:
-        if request.path == '/admin.html':
-            return
+    error = check_admin_role(path, payload)
+    if error:
+        return None, error
+    return payload, None
+
+
+# --- Admission Control (Load Shedding) ---
+# Jumlah request /api/ yang diproses bersamaan di satu worker dibatasi oleh
+# limit adaptif (AIMD): limit naik sekitar 1 per limit request yang selesai
+# normal dan turun berlipat saat request lambat atau service membalas 503/504.
+# "Lambat" dinilai terhadap baseline latensi masing-masing route, karena
+# latensi normal tiap endpoint berbeda jauh (login memang ~0.3 detik karena
+# hash password, GET publik hanya beberapa milidetik).
+# Setiap kelas prioritas hanya boleh memakai sebagian limit, sehingga saat
+# penuh GET publik anonim ditolak lebih dulu, sedangkan login dan penulisan
+# admin ditolak paling akhir. Request yang ditolak langsung mendapat 503.
+# Kelas ditentukan sebelum validasi JWT, jadi hanya token yang sudah pernah
+# diverifikasi (ada di token_cache) yang dihitung; token lain, termasuk yang
+# palsu atau kedaluwarsa, masuk kelas terendah.
+ADMISSION_CONTROL = os.environ.get("ADMISSION_CONTROL", "True").lower() in ("1", "true", "yes")
+ADMISSION_INITIAL_LIMIT = float(os.environ.get("ADMISSION_INITIAL_LIMIT", 20))
+ADMISSION_MIN_LIMIT = float(os.environ.get("ADMISSION_MIN_LIMIT", 4))
+ADMISSION_MAX_LIMIT = float(os.environ.get("ADMISSION_MAX_LIMIT", 200))
+# Request dianggap lambat jika latensinya > baseline route x toleransi dan
+# juga > floor (agar jitter pada endpoint yang sangat cepat tidak dihitung)
+ADMISSION_LATENCY_TOLERANCE = float(os.environ.get("ADMISSION_LATENCY_TOLERANCE", 2.0))
+ADMISSION_LATENCY_FLOOR = float(os.environ.get("ADMISSION_LATENCY_FLOOR", 0.05))
+# Jumlah maksimum route yang baseline-nya disimpan; sisanya berbagi satu baseline
+ADMISSION_MAX_ROUTES = int(os.environ.get("ADMISSION_MAX_ROUTES", 256))
+ADMISSION_BACKOFF_RATIO = float(os.environ.get("ADMISSION_BACKOFF_RATIO", 0.9))
+ADMISSION_RETRY_AFTER = int(os.environ.get("ADMISSION_RETRY_AFTER", 1))
+
+PRIORITY_PUBLIC = 0      # GET anonim ke endpoint publik
+PRIORITY_USER = 1        # request dengan token
+PRIORITY_CRITICAL = 2    # login, refresh token, dan penulisan admin
+PRIORITY_NAMES = {PRIORITY_PUBLIC: 'public', PRIORITY_USER: 'user', PRIORITY_CRITICAL: 'critical'}
+# Porsi limit yang boleh dipakai tiap kelas prioritas
+ADMISSION_PRIORITY_SHARES = {
+    PRIORITY_PUBLIC: float(os.environ.get("ADMISSION_PUBLIC_SHARE", 0.6)),
+    PRIORITY_USER: float(os.environ.get("ADMISSION_USER_SHARE", 0.85)),
+    PRIORITY_CRITICAL: 1.0,
+}
+
+
+# Baseline turun cepat ke latensi normal dan naik perlahan, sehingga lonjakan
+# latensi saat overload tidak langsung dianggap normal
+_BASELINE_DECAY_DOWN = 0.1
+_BASELINE_DECAY_UP = 0.01
+
+
+class AdaptiveLimiter:
+    """Limit konkurensi AIMD dengan kelas prioritas."""
+    def __init__(self, initial, minimum, maximum):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.shed = {name: 0 for name in PRIORITY_NAMES.values()}
+        self._baselines = {}     # route -> latensi normal (EWMA asimetris)
+        self._lock = threading.Lock()
+
+    def try_acquire(self, priority):
+        with self._lock:
+            # Minimal satu request per kelas selalu boleh jalan
+            if self.in_flight >= max(1, self.limit * ADMISSION_PRIORITY_SHARES[priority]):
+                self.shed[PRIORITY_NAMES[priority]] += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def _is_slow(self, route, latency):
+        """Bandingkan latensi dengan baseline route lalu perbarui baseline-nya."""
+        if route not in self._baselines and len(self._baselines) >= ADMISSION_MAX_ROUTES:
+            route = 'other'
+        baseline = self._baselines.get(route)
+        if baseline is None:
+            self._baselines[route] = latency
+            return False
+        decay = _BASELINE_DECAY_UP if latency > baseline else _BASELINE_DECAY_DOWN
+        self._baselines[route] = baseline + (latency - baseline) * decay
+        return latency > ADMISSION_LATENCY_FLOOR and latency > baseline * ADMISSION_LATENCY_TOLERANCE
+
+    def release(self, route, latency, overloaded=False):
+        with self._lock:
+            slow = self._is_slow(route, latency)
+            if overloaded or slow:
+                self.limit = max(self.minimum, self.limit * ADMISSION_BACKOFF_RATIO)
+            elif self.in_flight * 2 >= self.limit:
+                # Naikkan limit hanya jika limit yang sekarang memang terpakai;
+                # +1/limit per request = +1 per satu putaran penuh limit
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.in_flight -= 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "limit": round(self.limit, 2),
+                "inFlight": self.in_flight,
+                "shed": dict(self.shed),
+                "trackedRoutes": len(self._baselines),
+            }
+
+
+admission_limiter = AdaptiveLimiter(ADMISSION_INITIAL_LIMIT, ADMISSION_MIN_LIMIT, ADMISSION_MAX_LIMIT)
+
+
+def request_priority(method, path, auth_header):
+    """Kelas prioritas request dari path dan payload token yang sudah terverifikasi."""
+    if path in ('/api/user/login', '/api/user/refresh'):
+        return PRIORITY_CRITICAL
+    parts = (auth_header or '').split()
+    payload = token_cache.peek(parts[1]) if len(parts) == 2 and parts[0].lower() == 'bearer' else None
+    if payload is None:
+        return PRIORITY_PUBLIC
+    if method not in ('GET', 'HEAD') and '/admin' in path and payload.get('role') == 'admin':
+        return PRIORITY_CRITICAL
+    return PRIORITY_USER
+
+
+def overloaded_result():
+    """Body, status, dan header untuk request yang ditolak admission control."""
+    return ({"error": "Gateway is overloaded, please retry later"}, 503,
+            {"Retry-After": str(ADMISSION_RETRY_AFTER)})
+
+
+# Hook ini didaftarkan sebelum validasi JWT agar request yang ditolak
+# tidak sempat memakai CPU untuk verifikasi token.
+@app.before_request
+def admit_request():
+    if not ADMISSION_CONTROL or not request.path.startswith('/api/'):
+        return
+    priority = request_priority(request.method, request.path, request.headers.get('Authorization'))
+    if not admission_limiter.try_acquire(priority):
+        body, status, headers = overloaded_result()
+        return jsonify(body), status, headers
+    g.admitted_at = time.perf_counter()
+
 
-        role = g.user_payload.get('role')
-        if role != 'admin':
-            return jsonify({"error": "Admin access required for this resource"}), 403
+@app.after_request
+def record_admission_status(response):
+    if 'admitted_at' in g:
+        g.admission_overloaded = response.status_code in (503, 504)
+    return response
+
+
+@app.teardown_request
+def release_admission(exc):
+    started = g.pop('admitted_at', None)
+    if started is None:
+        return
+    overloaded = exc is not None or g.get('admission_overloaded', False)
+    route = f'{request.method} {normalize_api_path(request.path)}'
+    admission_limiter.release(route, time.perf_counter() - started, overloaded)
+
+
+# --- Hook Validasi JWT ---
+@app.before_request
+def require_jwt_authentication():
+    """
+    Hook ini berjalan sebelum SETIAP request.
+    """
+    started = time.perf_counter()
+    payload, error = authenticate_request(request.path, request.headers.get('Authorization'))
+    if request.path not in PUBLIC_PATHS:
+        metrics.observe('gateway_jwt_validation_seconds', (), time.perf_counter() - started)
+    if error:
+        body, status = error
+        return jsonify(body), status
+    if payload is not None:
+        g.user_payload = payload
     return
 
 
+# --- Mode Streaming ---
+# Jika aktif, body request/response diteruskan per-chunk tanpa ditampung penuh
+# di memori worker, sehingga pemakaian memori tetap datar untuk payload besar.
+PROXY_STREAMING = os.environ.get("PROXY_STREAMING", "False").lower() in ['true', '1']
+PROXY_STREAM_CHUNK_SIZE = int(os.environ.get("PROXY_STREAM_CHUNK_SIZE", 64 * 1024))
+
+# Header hop-by-hop yang tidak boleh diteruskan apa adanya
+EXCLUDED_HEADERS = ['content-encoding', 'transfer-encoding', 'connection', 'content-length']
+
+
+class _RequestBodyStream:
+    """
+    Membungkus stream body dari client agar requests mengirimnya per-chunk
+    dengan Content-Length asli (tanpa membaca seluruh body ke memori).
+    """
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        return iter(lambda: self.stream.read(PROXY_STREAM_CHUNK_SIZE), b'')
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+
+def _streaming_request_body():
+    """Menyiapkan body request client untuk diteruskan secara streaming."""
+    if request.content_length:
+        return _RequestBodyStream(request.stream, request.content_length)
+    if request.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+        # Body tanpa panjang diketahui: kirim ulang sebagai chunked
+        return iter(lambda: request.stream.read(PROXY_STREAM_CHUNK_SIZE), b'')
+    return None
+
+
+def _filter_response_headers(resp):
+    return [
+        (k, v) for k, v in resp.headers.items()
+        if k.lower() not in EXCLUDED_HEADERS
+    ]
+
+
+# --- Cache Respons untuk Endpoint Publik ---
+# TTL (detik) per path publik yang boleh di-cache. Path lain selalu diteruskan.
+RESPONSE_CACHE_TTLS = {
+    '/api/route/routes': int(os.environ.get("CACHE_TTL_ROUTES", 30)),
+    '/api/stop/stops': int(os.environ.get("CACHE_TTL_STOPS", 60)),
+    '/api/bus/buses': int(os.environ.get("CACHE_TTL_BUSES", 5)),
+    '/api/schedule/schedules': int(os.environ.get("CACHE_TTL_SCHEDULES", 30)),
+}
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+# Cache ada di memori tiap worker gunicorn. Agar penulisan lewat satu worker
+# juga membatalkan cache worker lain, setiap invalidasi menyentuh file stempel
+# per service di direktori ini (dibagi oleh semua worker dalam satu container),
+# dan entry yang diambil sebelum stempel terakhir dianggap basi. Beberapa
+# container gateway tidak berbagi direktori ini: di antara container, data
+# tetap bisa basi sampai TTL (CACHE_TTL_*) habis. Kosong = hanya per worker.
+RESPONSE_CACHE_INVALIDATION_DIR = os.environ.get(
+    "RESPONSE_CACHE_INVALIDATION_DIR", os.path.join(tempfile.gettempdir(), "gateway-cache-invalidation"))
+
+
+class ResponseCache:
+    """
+    Cache respons upstream (per worker) dengan TTL per entry dan batas memori.
+    Entry yang paling lama tidak dipakai dibuang lebih dulu (LRU).
+    """
+    def __init__(self, max_bytes, invalidation_dir=None):
+        self.max_bytes = max_bytes
+        self.invalidation_dir = invalidation_dir
+        if invalidation_dir:
+            try:
+                os.makedirs(invalidation_dir, exist_ok=True)
+            except OSError:
+                # Misal filesystem read-only: invalidasi hanya berlaku per worker
+                self.invalidation_dir = None
+        # key -> (expires_at, size, status, headers, body, fetched_at_ns)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        stamp = self._stamp(key[1])
+        with self._lock:
+            entry = self._entries.get(key)
+            stale = entry is not None and entry[5] <= stamp
+            if entry is None or stale or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                if stale:
+                    self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2], entry[3], entry[4]
+
+    def set(self, key, status, headers, body, ttl, fetched_at=None):
+        """fetched_at = time.time_ns() sebelum request upstream dikirim."""
+        size = len(body) + sum(len(k) + len(v) for k, v in headers)
+        if size > self.max_bytes:
+            return
+        fetched_at = time.time_ns() if fetched_at is None else fetched_at
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, size, status, headers, body, fetched_at)
+            self.size += size
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_prefix(self, prefix):
+        """
+        Hapus semua entry yang path-nya diawali prefix service (misal
+        '/api/bus/') di worker ini, dan tandai basi di worker lain.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[1].startswith(prefix)]:
+                self._remove(key)
+                self.invalidations += 1
+        path = self._stamp_path(prefix)
+        if path:
+            now = time.time_ns()
+            try:
+                with open(path, 'a'):
+                    pass
+                os.utime(path, ns=(now, now))
+            except OSError:
+                pass
+
+    def _stamp_path(self, path):
+        """File stempel untuk service dari path '/api/<service>/...'."""
+        parts = path.split('/', 3)
+        if not self.invalidation_dir or len(parts) < 3 or parts[1] != 'api':
+            return None
+        return os.path.join(self.invalidation_dir, parts[2])
+
+    def _stamp(self, path):
+        """Waktu (ns) invalidasi terakhir service untuk path, 0 jika belum pernah."""
+        stamp_path = self._stamp_path(path)
+        if not stamp_path:
+            return 0
+        try:
+            return os.stat(stamp_path).st_mtime_ns
+        except OSError:
+            return 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.size -= entry[1]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_INVALIDATION_DIR)
+
+
+def _response_cache_key():
+    """Key cache: method, path, dan query string (None jika tidak bisa di-cache)."""
+    if request.method != 'GET' or request.path not in RESPONSE_CACHE_TTLS:
+        return None
+    return (request.method, request.path, request.query_string.decode('latin-1'))
+
+
+# --- Single-Flight untuk GET Identik ---
+# GET yang identik (path, query, dan scope auth sama) dan datang bersamaan
+# cukup memicu satu panggilan upstream; hasilnya dibagikan ke semua peminta.
+# Efektif jika worker gunicorn memakai thread (misal --threads 8).
+COALESCE_GETS = os.environ.get("COALESCE_GETS", "True").lower() in ['true', '1']
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Menggabungkan panggilan bersamaan dengan key yang sama menjadi satu."""
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Return (hasil, shared). shared=True jika hasil milik panggilan lain."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _InFlightCall()
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+    def stats(self):
+        return {
+            "upstreamCalls": self.leaders,
+            "coalesced": self.coalesced,
+            "inFlightKeys": len(self._calls),
+        }
+
+
+single_flight = SingleFlight()
+
+
+def _coalesce_key(service_name, path):
+    """Key GET identik: service, path, query string, dan header Authorization."""
+    return (
+        service_name,
+        path,
+        request.query_string.decode('latin-1'),
+        request.headers.get('Authorization', ''),
+    )
+
+
+# --- Kompresi Respons ---
+# JSON dari service dikompres (br/gzip sesuai Accept-Encoding client) jika
+# ukurannya minimal COMPRESS_MIN_SIZE byte.
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", 6))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", 5))
+SUPPORTED_ENCODINGS = ['br', 'gzip'] if brotli else ['gzip']
+
+
+def negotiate_encoding(accept_encoding):
+    """Pilih encoding terbaik yang didukung ('br'/'gzip') atau None."""
+    if not accept_encoding:
+        return None
+    return parse_accept_header(accept_encoding).best_match(SUPPORTED_ENCODINGS)
+
+
+def compress_body(body, encoding, static=False):
+    """Kompres body; static=True memakai level maksimum (hanya sekali saat startup)."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=11 if static else COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=9 if static else COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+def _compress_response(response):
+    """Kompres respons JSON yang cukup besar sesuai Accept-Encoding client."""
+    if (response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or not (response.mimetype or '').endswith('json')):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if not encoding:
+        return response
+    response.set_data(compress_body(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+# --- Retry & Hedging untuk GET ---
+# Hanya metode idempotent yang boleh dikirim lebih dari sekali. Retry dilakukan
+# pada gagal koneksi dengan backoff eksponensial + jitter. Hedge: jika GET belum
+# dijawab setelah persentil HEDGE_PERCENTILE latensi terakhir, kirim salinan ke
+# replika lain dan pakai respons yang datang lebih dulu. Retry dan hedge
+# sama-sama memakai token dari retry budget agar tidak melipatgandakan beban
+# saat service sedang bermasalah.
+RETRY_METHODS = ('GET', 'HEAD')
+UPSTREAM_MAX_RETRIES = int(os.environ.get("UPSTREAM_MAX_RETRIES", 2))
+RETRY_BACKOFF_BASE = float(os.environ.get("RETRY_BACKOFF_BASE", 0.05))
+RETRY_BACKOFF_MAX = float(os.environ.get("RETRY_BACKOFF_MAX", 1.0))
+# Setiap request asli menabung RETRY_BUDGET_RATIO token (maks RETRY_BUDGET_MAX)
+RETRY_BUDGET_RATIO = float(os.environ.get("RETRY_BUDGET_RATIO", 0.1))
+RETRY_BUDGET_MAX = float(os.environ.get("RETRY_BUDGET_MAX", 10))
+
+HEDGE_GETS = os.environ.get("HEDGE_GETS", "True").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", 95))
+HEDGE_MIN_DELAY = float(os.environ.get("HEDGE_MIN_DELAY", 0.01))
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", 20))
+HEDGE_SAMPLE_SIZE = int(os.environ.get("HEDGE_SAMPLE_SIZE", 200))
+# Setiap thread gthread (--threads 32 di Dockerfile) bisa memegang satu
+# request utama dan satu hedge sekaligus, jadi pool tidak boleh lebih kecil
+# dari 2x jumlah thread; jika lebih kecil, request utama ikut mengantre.
+HEDGE_MAX_WORKERS = int(os.environ.get("HEDGE_MAX_WORKERS", 64))
+
+
+class RetryBudget:
+    """Token bucket retry per service: retry hanya boleh jika masih ada token."""
+    def __init__(self, ratio, max_tokens):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class LatencyTracker:
+    """Latensi respons sukses terakhir per service, untuk menghitung jeda hedge."""
+    def __init__(self, size):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def hedge_delay(self):
+        """Persentil latensi terakhir, atau None jika sampel belum cukup."""
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))
+        return max(HEDGE_MIN_DELAY, ordered[index])
+
+
+RETRY_BUDGETS = {name: RetryBudget(RETRY_BUDGET_RATIO, RETRY_BUDGET_MAX) for name in SERVICE_URLS}
+UPSTREAM_LATENCIES = {name: LatencyTracker(HEDGE_SAMPLE_SIZE) for name in SERVICE_URLS}
+# Thread tidak dibuat sebelum dipakai, jadi aman dibuat sebelum fork gunicorn
+HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="hedge")
+
+
+def _retry_backoff(attempt):
+    """Full jitter: jeda acak antara 0 dan base * 2^attempt (dibatasi max)."""
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** attempt)))
+
+
+def _spend_retry_token(service_name):
+    if RETRY_BUDGETS[service_name].withdraw():
+        return True
+    metrics.inc('gateway_retry_budget_exhausted_total', (('service', service_name),))
+    return False
+
+
 # 2. Fungsi forwarder 
-def forward_to_service(service_name, path):
+def _error_result(message, status, retry_after=None):
+    """Hasil gagal cepat dalam bentuk (status, headers, body) dengan shape JSON yang sama."""
+    headers = [('Content-Type', 'application/json')]
+    if retry_after is not None:
+        headers.append(('Retry-After', str(retry_after)))
+    return status, headers, json.dumps({"error": message}).encode('utf-8')
+
+
+def _send_upstream(service_name, method, target, headers, data, stream=False, tried=None):
     """
-    Menerima request dari client dan meneruskannya (forward)
-    ke service internal yang sesuai.
+    Mengirim request ke service internal melalui circuit breaker dan bulkhead.
+    target = path + query string. GET/HEAD diulang ke replika lain jika koneksi
+    gagal (selama retry budget masih ada); metode lain tidak pernah diulang.
+    tried = daftar replika yang sudah dipakai request ini (diisi di sini).
+    Return (resp, None) jika terkirim, atau (None, hasil_error) jika gagal.
+    Untuk stream=True, pemanggil wajib memanggil _release_slot() setelah
+    body selesai dibaca.
     """
-    # Dapatkan URL service dari "peta"
-    base_url = SERVICE_URLS.get(service_name)
-    if not base_url:
-        return jsonify({"error": f"Service '{service_name}' not configured"}), 500
+    if tried is None:
+        tried = []
+    # Body streaming tidak bisa dibaca dua kali, jadi hanya body kosong/bytes yang diulang
+    retryable = method in RETRY_METHODS and (data is None or isinstance(data, bytes))
+    attempt = 0
+    while True:
+        resp, error, connect_failed = _send_once(service_name, method, target, headers,
+                                                 data, stream, tried)
+        if (not connect_failed or not retryable or attempt >= UPSTREAM_MAX_RETRIES
+                or not _spend_retry_token(service_name)):
+            return resp, error
+        time.sleep(_retry_backoff(attempt))
+        attempt += 1
+        metrics.inc('gateway_upstream_retries_total', (('service', service_name),))
 
-    # Gabungkan URL service dengan sisa path dari request
-    full_url = f"{base_url}/{path}"
 
-    headers = {k: v for k, v in request.headers.items() if k.lower() != 'host'}
+def _send_once(service_name, method, target, headers, data, stream, tried):
+    """Satu percobaan kirim: (resp, error, gagal_koneksi)."""
+    breaker = SERVICE_BREAKERS[service_name]
+    replica_set = SERVICE_REPLICAS[service_name]
 
+    # Retry/hedge yang datang setelah deadline tidak perlu dikirim lagi
+    timeout = upstream_timeout(int(headers[DEADLINE_HEADER]) / 1000.0)
+    if timeout is None:
+        metrics.inc('gateway_upstream_errors_total', (('service', service_name), ('kind', 'deadline')))
+        return None, _error_result(f"Service '{service_name}' timed out", 504), False
+
+    # Gagal cepat jika service sedang "trip" atau sudah penuh
+    if not breaker.allow_request():
+        metrics.inc('gateway_upstream_errors_total', (('service', service_name), ('kind', 'circuit_open')))
+        return None, _error_result(f"Service '{service_name}' is unavailable", 503, breaker.retry_after()), False
+    if not _acquire_slot(service_name):
+        breaker.cancel_request()
+        metrics.inc('gateway_upstream_errors_total', (('service', service_name), ('kind', 'bulkhead_full')))
+        return None, _error_result(f"Service '{service_name}' is unavailable", 503), False
+
+    replica = replica_set.acquire(exclude=tried)
+    tried.append(replica)
+    keep_slot = False
+    started = time.perf_counter()
     try:
-        resp = requests.request(
-            method=request.method,       # Teruskan metode (GET, POST, dll)
-            url=full_url,                # URL service internal
+        # Pakai session milik service agar koneksi keep-alive dipakai ulang
+        resp = SERVICE_SESSIONS[service_name].request(
+            method=method,               # Teruskan metode (GET, POST, dll)
+            url=f"{replica.url}/{target}",  # URL replika service internal
             headers=headers,             # Teruskan header (termasuk token)
-            data=request.get_data(),
-            params=request.args,
+            data=data,
             allow_redirects=False,
-            timeout=10.0               # Batas waktu 10 detik
+            timeout=timeout,             # (connect, read) dibatasi sisa deadline
+            stream=stream
         )
+        keep_slot = stream
+    except requests.exceptions.ConnectionError:
+        breaker.record_failure()
+        replica_set.release(replica, success=False)
+        metrics.inc('gateway_upstream_errors_total', (('service', service_name), ('kind', 'connection')))
+        return None, _error_result(f"Service '{service_name}' is unavailable", 503), True
+    except requests.exceptions.Timeout:
+        breaker.record_failure()
+        replica_set.release(replica, success=False)
+        metrics.inc('gateway_upstream_errors_total', (('service', service_name), ('kind', 'timeout')))
+        return None, _error_result(f"Service '{service_name}' timed out", 504), False
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe('gateway_upstream_duration_seconds', (('service', service_name),), elapsed)
+        if not keep_slot:
+            _release_slot(service_name)
 
-        # 3. Buat respons baru untuk dikirim kembali ke client
-        excluded_headers = ['content-encoding', 'transfer-encoding', 'connection', 'content-length']
+    # Respons 5xx dihitung sebagai kegagalan service
+    if resp.status_code >= 500:
+        breaker.record_failure()
+        replica_set.release(replica, success=False)
+        metrics.inc('gateway_upstream_errors_total', (('service', service_name), ('kind', 'http_5xx')))
+    else:
+        breaker.record_success()
+        replica_set.release(replica, success=True)
+        UPSTREAM_LATENCIES[service_name].record(elapsed)
+    return resp, None, False
 
-        response_headers = [
-            (k, v) for k, v in resp.headers.items()
-            if k.lower() not in excluded_headers
-        ]
 
-        response = Response(resp.content, resp.status_code, response_headers)
+def _proxy_buffered(service_name, method, target, headers, data, tried=None):
+    """Meneruskan request dan membaca respons penuh: (status, headers, body)."""
+    resp, error = _send_upstream(service_name, method, target, headers, data, tried=tried)
+    if error:
+        return error
+    return resp.status_code, _filter_response_headers(resp), resp.content
+
+
+def _run_started(started, service_name, method, target, headers, data, tried):
+    started.set()
+    return _proxy_buffered(service_name, method, target, headers, data, tried)
+
+
+def _proxy_hedged(service_name, method, target, headers, data):
+    """
+    Seperti _proxy_buffered, tetapi jika respons belum datang setelah jeda
+    hedge, salinan request dikirim ke replika lain dan respons pertama dipakai.
+    Request yang kalah tetap selesai di background dan hasilnya dibuang.
+    """
+    delay = UPSTREAM_LATENCIES[service_name].hedge_delay()
+    if delay is None:
+        return _proxy_buffered(service_name, method, target, headers, data)
+
+    tried = []
+    started = threading.Event()
+    primary = HEDGE_EXECUTOR.submit(_run_started, started, service_name, method, target, headers, data, tried)
+    # Jeda hedge dihitung sejak request utama benar-benar dikirim; waktu
+    # antre di pool bukan latensi upstream dan tidak boleh memicu hedge
+    started.wait()
+    done, _ = wait([primary], timeout=delay)
+    if done or not _spend_retry_token(service_name):
+        return primary.result()
+
+    hedge = HEDGE_EXECUTOR.submit(_proxy_buffered, service_name, method, target, headers, data, tried)
+    pending = {primary, hedge}
+    while True:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        winner = next(iter(done))
+        result = winner.result()
+        # Jawaban 5xx/gagal hanya dipakai jika request lainnya juga sudah selesai
+        if result[0] < 500 or not pending:
+            outcome = 'won' if winner is hedge else 'lost'
+            metrics.inc('gateway_upstream_hedges_total', (('service', service_name), ('outcome', outcome)))
+            return result
+
+
+def _build_response(result):
+    status, headers, body = result
+    return Response(body, status, headers)
+
+
+def forward_to_service(service_name, path):
+    """
+    Menerima request dari client dan meneruskannya (forward)
+    ke service internal yang sesuai.
+    """
+    # Pastikan service punya minimal satu replika di "peta"
+    if not SERVICE_URLS.get(service_name):
+        return jsonify({"error": f"Service '{service_name}' not configured"}), 500
+
+    # Sisa path (dan query string) dari request; replika dipilih saat dikirim
+    target = path
+    if request.query_string:
+        target += '?' + request.query_string.decode('latin-1')
+
+    # Endpoint publik yang bisa di-cache dilayani dari cache jika masih segar
+    cache_key = _response_cache_key()
+    if cache_key:
+        cached = response_cache.get(cache_key)
+        if cached:
+            response = _build_response(cached)
+            response.headers['X-Cache'] = 'HIT'
+            return _compress_response(response)
+
+    # Respons yang akan di-cache harus dibaca penuh, jadi tidak di-stream
+    streaming = PROXY_STREAMING and not cache_key
+
+    headers = {
+        k: v for k, v in request.headers.items()
+        if k.lower() != 'host' and (not streaming or k.lower() not in EXCLUDED_HEADERS)
+    }
+    headers[DEADLINE_HEADER] = str(int(request_deadline(request.headers.get(DEADLINE_HEADER)) * 1000))
+    is_write = request.method not in ('GET', 'HEAD')
+
+    # Setiap request client menambah retry budget service tujuannya
+    RETRY_BUDGETS[service_name].deposit()
+
+    if streaming:
+        resp, error = _send_upstream(service_name, request.method, target, headers,
+                                     _streaming_request_body(), stream=True)
+        if error:
+            return _build_response(error)
+
+        # Penulisan data (admin) membuat isi cache service tersebut basi
+        if is_write and resp.status_code < 400:
+            response_cache.invalidate_prefix(f"/api/{service_name}/")
+
+        cleanup_lock = threading.Lock()
+        cleaned_up = []
+
+        def cleanup():
+            # Kembalikan koneksi ke pool dan slot bulkhead tepat satu kali.
+            # Didaftarkan lewat call_on_close agar tetap berjalan walau body
+            # tidak pernah diiterasi (HEAD, client memutus sebelum membaca);
+            # finally di generator menjadi cadangan jika server tidak memanggil close().
+            with cleanup_lock:
+                if cleaned_up:
+                    return
+                cleaned_up.append(True)
+            resp.close()
+            _release_slot(service_name)
+
+        def generate():
+            try:
+                for chunk in resp.iter_content(chunk_size=PROXY_STREAM_CHUNK_SIZE):
+                    yield chunk
+            finally:
+                cleanup()
+
+        response = Response(generate(), resp.status_code, _filter_response_headers(resp),
+                            direct_passthrough=True)
+        response.call_on_close(cleanup)
         return response
 
-    except requests.exceptions.ConnectionError:
-        return jsonify({"error": f"Service '{service_name}' is unavailable"}), 503
-    except requests.exceptions.Timeout:
-        return jsonify({"error": f"Service '{service_name}' timed out"}), 504
+    proxy = _proxy_hedged if HEDGE_GETS and request.method == 'GET' else _proxy_buffered
+
+    # Diambil sebelum dikirim: invalidasi dari worker lain setelah titik ini
+    # membuat hasil ini tidak dipakai dari cache
+    fetched_at = time.time_ns()
+
+    def send():
+        return proxy(service_name, request.method, target, headers, request.get_data())
+
+    shared = False
+    if request.method == 'GET' and COALESCE_GETS:
+        result, shared = single_flight.do(_coalesce_key(service_name, path), send)
+    else:
+        result = send()
+
+    status = result[0]
+    if is_write and status < 400:
+        response_cache.invalidate_prefix(f"/api/{service_name}/")
+    if cache_key and status == 200 and not shared:
+        response_cache.set(cache_key, *result, RESPONSE_CACHE_TTLS[request.path], fetched_at)
+
+    # 3. Buat respons baru untuk dikirim kembali ke client
+    response = _build_response(result)
+    if cache_key:
+        response.headers['X-Cache'] = 'MISS'
+    if shared:
+        response.headers['X-Coalesced'] = 'true'
+    return _compress_response(response)
 
 # === Rute Gateway ===
 
+@app.route('/gateway/stats')
+def gateway_stats():
+    """Statistik internal gateway (pool koneksi, cache, single-flight)."""
+    return jsonify({
+        "pools": get_pool_stats(),
+        "responseCache": response_cache.stats(),
+        "jwtCache": token_cache.stats(),
+        "coalescing": single_flight.stats(),
+        "admission": admission_limiter.snapshot(),
+        "retryBudget": {
+            name: {
+                "tokens": round(RETRY_BUDGETS[name].tokens, 2),
+                "hedgeDelay": UPSTREAM_LATENCIES[name].hedge_delay(),
+            }
+            for name in SERVICE_URLS
+        }
+    })
+
+@app.route('/metrics')
+def gateway_metrics():
+    """Metrics gateway untuk di-scrape (format teks Prometheus)."""
+    return Response(render_metrics(), 200, mimetype='text/plain; version=0.0.4')
+
+@app.route('/gateway/admin/breakers')
+def gateway_breakers():
+    """State circuit breaker dan bulkhead tiap service (khusus admin)."""
+    return jsonify({
+        "pid": os.getpid(),
+        "services": get_breaker_stats()
+    })
+
+# --- Frontend Statis (dikompres sekali saat startup) ---
+# URL halaman HTML tidak diberi versi, jadi browser wajib memvalidasi ulang
+# (If-None-Match -> 304) agar halaman baru langsung terpakai setelah deploy.
+# max-age panjang hanya aman untuk aset yang nama filenya memuat hash isi.
+STATIC_HTML_CACHE_CONTROL = 'no-cache'
+STATIC_PAGES = ['index.html', 'admin.html']
+
+
+def _load_static_assets():
+    """
+    Membaca halaman frontend sekali, lalu menyiapkan versi asli, gzip, dan br
+    beserta ETag kuat (hash isi) untuk tiap representasi.
+    """
+    assets = {}
+    for filename in STATIC_PAGES:
+        file_path = os.path.join(app.static_folder, filename)
+        if not os.path.isfile(file_path):
+            continue
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        variants = {None: (content, f'"{digest}"')}
+        for encoding in SUPPORTED_ENCODINGS:
+            variants[encoding] = (compress_body(content, encoding, static=True), f'"{digest}-{encoding}"')
+        assets[filename] = variants
+    return assets
+
+
+STATIC_ASSETS = _load_static_assets()
+
+
+def serve_static_page(filename):
+    """Melayani halaman frontend yang sudah dikompres dengan ETag dan Cache-Control."""
+    variants = STATIC_ASSETS.get(filename)
+    if variants is None:
+        return send_from_directory(app.static_folder, filename)
+
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    body, etag = variants.get(encoding, variants[None])
+
+    response = Response(body, 200, mimetype='text/html')
+    response.set_etag(etag.strip('"'))
+    response.headers['Cache-Control'] = STATIC_HTML_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response.make_conditional(request)
+
+
 @app.route('/admin.html')
 def admin_page():
     """Melayani halaman admin.html"""
-    return send_from_directory(app.static_folder, 'admin.html')
+    return serve_static_page('admin.html')
 
 @app.route('/')
+@app.route('/index.html')
 def index_page():
     """Melayani halaman index.html"""
-    return send_from_directory(app.static_folder, 'index.html')
+    return serve_static_page('index.html')
+
+# --- Batch Request ---
+BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", 20))
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", 4))
+BATCH_TIMEOUT = float(os.environ.get("BATCH_TIMEOUT", 10.0))
+
+
+def _run_sub_request(service_name, service_path, method, path, query, body, auth_header, deadline):
+    """Menjalankan satu sub-request batch lewat forward_to_service."""
+    # Sub-request memakai sisa deadline batch, bukan budget penuh masing-masing
+    headers = {DEADLINE_HEADER: str(int(deadline * 1000))}
+    if auth_header:
+        headers['Authorization'] = auth_header
+    data = None
+    if body is not None:
+        headers['Content-Type'] = 'application/json'
+        data = json.dumps(body)
+
+    with app.test_request_context(path, method=method, headers=headers,
+                                  data=data, query_string=query):
+        response = app.make_response(forward_to_service(service_name, service_path))
+        payload = response.get_json(silent=True)
+        if payload is None:
+            payload = response.get_data(as_text=True)
+        return response.status_code, payload
+
+
+def _split_sub_request_path(path, query):
+    """
+    Pisahkan query string yang ditulis di path ("/api/route/routes?page=1")
+    lalu gabungkan dengan field "query" (string atau dict).
+    Return (path, query_string), atau (None, None) jika tidak valid.
+    """
+    if not isinstance(path, str):
+        return None, None
+    if isinstance(query, dict):
+        query = urlencode(query, doseq=True)
+    elif query is None:
+        query = ''
+    elif not isinstance(query, str):
+        return None, None
+    parts = urlsplit(path)
+    if parts.scheme or parts.netloc:
+        return None, None
+    query = '&'.join(q for q in (parts.query, query.lstrip('?')) if q)
+    return parts.path, query
+
+
+@app.route('/api/batch', methods=['POST'])
+def batch_requests():
+    """
+    POST /api/batch: Menjalankan beberapa request ke service sekaligus.
+    Body JSON:
+    {
+        "requests": [
+            {"id": "buses", "method": "GET", "path": "/api/bus/buses"},
+            {"id": "routes", "path": "/api/route/routes", "query": "page=1"}
+        ]
+    }
+    Token (jika ada) divalidasi sekali untuk seluruh batch, lalu aturan
+    PUBLIC_PATHS dan role admin diterapkan ke tiap sub-request.
+    """
+    data = request.get_json(silent=True) or {}
+    sub_requests = data.get('requests')
+    if not isinstance(sub_requests, list) or not sub_requests:
+        return jsonify({"error": "Field 'requests' harus berupa list yang tidak kosong"}), 400
+    if len(sub_requests) > BATCH_MAX_REQUESTS:
+        return jsonify({"error": f"Maksimal {BATCH_MAX_REQUESTS} request per batch"}), 400
+
+    auth_header = request.headers.get('Authorization')
+    auth_result = None   # (payload, error) - token divalidasi sekali saja
+    deadline = min(request_deadline(request.headers.get(DEADLINE_HEADER)), time.time() + BATCH_TIMEOUT)
+
+    results = [None] * len(sub_requests)
+    jobs = []
+    for index, sub in enumerate(sub_requests):
+        sub = sub if isinstance(sub, dict) else {}
+        request_id = sub.get('id', index)
+        method = str(sub.get('method', 'GET')).upper()
+        path, query = _split_sub_request_path(sub.get('path'), sub.get('query'))
+        parts = (path or '').split('/', 3)
+
+        if (path is None or method not in ('GET', 'POST', 'PUT', 'DELETE') or len(parts) < 4
+                or parts[1] != 'api' or parts[2] not in SERVICE_URLS):
+            results[index] = {"id": request_id, "status": 400,
+                              "body": {"error": "Sub-request tidak valid"}}
+            continue
+
+        if path not in PUBLIC_PATHS:
+            if auth_result is None:
+                auth_result = verify_auth_header(auth_header)
+            payload, error = auth_result
+            error = error or check_admin_role(path, payload)
+            if error:
+                body, status = error
+                results[index] = {"id": request_id, "status": status, "body": body}
+                continue
+
+        jobs.append((index, request_id, (parts[2], parts[3], method, path,
+                                         query, sub.get('body'), auth_header, deadline)))
+
+    if jobs:
+        executor = ThreadPoolExecutor(max_workers=min(BATCH_MAX_CONCURRENCY, len(jobs)))
+        futures = {executor.submit(_run_sub_request, *args): (index, request_id)
+                   for index, request_id, args in jobs}
+        done, _ = wait(futures, timeout=max(0.0, deadline - time.time()))
+        # Sub-request yang belum selesai tidak ditunggu lagi
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        for future, (index, request_id) in futures.items():
+            if future not in done:
+                results[index] = {"id": request_id, "status": 504,
+                                  "body": {"error": "Batch timed out"}}
+            elif future.exception() is not None:
+                results[index] = {"id": request_id, "status": 502,
+                                  "body": {"error": str(future.exception())}}
+            else:
+                status, body = future.result()
+                results[index] = {"id": request_id, "status": status, "body": body}
+
+    return _compress_response(jsonify({"responses": results}))
+
 
 # --- Rute Forwarding ---
 @app.route('/api/user/', defaults={'path': ''})
@@ -0,0 +1,413 @@
+"""
+API Gateway mode ASGI (asyncio).
+
+Aturan akses (PUBLIC_PATHS, JWT, role admin) dan peta SERVICE_URLS sama
+dengan gateway Flask di app.py, tetapi setiap request yang sedang menunggu
+service internal tidak lagi memegang satu worker penuh. Satu proses bisa
+melayani ribuan panggilan upstream yang lambat secara bersamaan.
+
+Komponen yang dipakai bersama dengan app.py: admission control, circuit
+breaker & bulkhead, pemilihan/ejeksi replika, deadline, metrics (/metrics,
+/gateway/admin/breakers) dan halaman frontend. Yang BELUM ada di mode ini:
+cache respons, penggabungan GET identik (single-flight), retry & hedging,
+kompresi respons JSON, dan /api/batch. Agar perilaku gateway tidak berubah
+diam-diam saat engine diganti, startup gagal jika fitur tersebut masih
+aktif di konfigurasi (lihat UNSUPPORTED_SETTINGS).
+
+Menjalankan (fitur yang belum didukung dimatikan secara eksplisit):
+    COALESCE_GETS=False HEDGE_GETS=False UPSTREAM_MAX_RETRIES=0 \
+    CACHE_TTL_ROUTES=0 CACHE_TTL_STOPS=0 CACHE_TTL_BUSES=0 CACHE_TTL_SCHEDULES=0 \
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import os
+import json
+import time
+
+import httpx
+
+from app import (
+    authenticate_request,
+    SERVICE_URLS,
+    SERVICE_REPLICAS,
+    SERVICE_POOL_SIZES,
+    UPSTREAM_CONNECT_TIMEOUT,
+    UPSTREAM_READ_TIMEOUT,
+    DEADLINE_HEADER,
+    request_deadline,
+    upstream_timeout,
+    EXCLUDED_HEADERS,
+    PROXY_STREAM_CHUNK_SIZE,
+    STATIC_ASSETS,
+    STATIC_HTML_CACHE_CONTROL,
+    negotiate_encoding,
+    ADMISSION_CONTROL,
+    admission_limiter,
+    normalize_api_path,
+    request_priority,
+    overloaded_result,
+    SERVICE_BREAKERS,
+    _acquire_slot,
+    _release_slot,
+    _in_flight,
+    get_breaker_stats,
+    metrics,
+    render_metrics,
+    _metric_labels,
+    _service_label,
+    COALESCE_GETS,
+    HEDGE_GETS,
+    UPSTREAM_MAX_RETRIES,
+    RESPONSE_CACHE_TTLS,
+)
+
+# Batas koneksi bersamaan ke satu service. Koneksi keep-alive yang disimpan
+# tetap mengikuti SERVICE_POOL_SIZES.
+ASGI_MAX_CONNECTIONS = int(os.environ.get("ASGI_MAX_CONNECTIONS", 1000))
+
+STATIC_PAGES = {
+    '/': 'index.html',
+    '/index.html': 'index.html',
+    '/admin.html': 'admin.html',
+}
+
+KNOWN_PATHS = set(STATIC_PAGES) | {'/gateway/stats', '/gateway/admin/breakers', '/metrics'}
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+]
+
+# Fitur app.py yang belum ada di mode ASGI: (aktif?, cara mematikan)
+UNSUPPORTED_SETTINGS = {
+    'response cache': (any(ttl > 0 for ttl in RESPONSE_CACHE_TTLS.values()),
+                       'CACHE_TTL_ROUTES/STOPS/BUSES/SCHEDULES=0'),
+    'single-flight GET': (COALESCE_GETS, 'COALESCE_GETS=False'),
+    'hedging': (HEDGE_GETS, 'HEDGE_GETS=False'),
+    'retry': (UPSTREAM_MAX_RETRIES > 0, 'UPSTREAM_MAX_RETRIES=0'),
+}
+
+
+def check_supported_settings():
+    """Raise RuntimeError jika konfigurasi memakai fitur yang tidak ada di mode ini."""
+    enabled = [f'{name} ({disable})' for name, (active, disable) in UNSUPPORTED_SETTINGS.items() if active]
+    if enabled:
+        raise RuntimeError('Gateway ASGI belum mendukung: ' + ', '.join(enabled)
+                           + '. Matikan lewat env tersebut atau jalankan app.py (gunicorn).')
+
+
+check_supported_settings()
+
+_clients = {}
+
+
+def _get_client(service_name):
+    """Client httpx per service, dibuat saat pertama kali dipakai di event loop."""
+    client = _clients.get(service_name)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=ASGI_MAX_CONNECTIONS,
+                max_keepalive_connections=SERVICE_POOL_SIZES[service_name],
+            ),
+            timeout=httpx.Timeout(
+                UPSTREAM_READ_TIMEOUT,
+                connect=UPSTREAM_CONNECT_TIMEOUT,
+                pool=UPSTREAM_READ_TIMEOUT,
+            ),
+            trust_env=False,
+        )
+        _clients[service_name] = client
+    return client
+
+
+async def _close_clients():
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
+
+
+def _resolve_service(path):
+    """
+    '/api/<service>/<path>' -> (service, path). Sama dengan rute forwarding
+    di app.py: '/api/<service>/' (tanpa sisa path) hanya menerima GET.
+    """
+    parts = path.split('/', 3)
+    if len(parts) < 4 or parts[0] != '' or parts[1] != 'api':
+        return None, None
+    return parts[2], parts[3]
+
+
+async def _send_json(send, body, status, extra_headers=None):
+    payload = json.dumps(body).encode('utf-8')
+    headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(payload)).encode('latin-1')),
+    ] + CORS_HEADERS
+    for key, value in (extra_headers or {}).items():
+        headers.append((key.lower().encode('latin-1'), value.encode('latin-1')))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers,
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def _send_static(send, filename, headers):
+    """Halaman frontend dari STATIC_ASSETS (sudah dikompres saat startup)."""
+    variants = STATIC_ASSETS.get(filename)
+    if variants is None:
+        return await _send_json(send, {"error": "Not Found"}, 404)
+    encoding = negotiate_encoding(next((v for k, v in headers if k == 'accept-encoding'), None))
+    content, etag = variants.get(encoding, variants[None])
+
+    response_headers = [
+        (b'etag', etag.encode('latin-1')),
+        (b'cache-control', STATIC_HTML_CACHE_CONTROL.encode('latin-1')),
+        (b'vary', b'Accept-Encoding'),
+    ] + CORS_HEADERS
+    if_none_match = next((v for k, v in headers if k == 'if-none-match'), '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')]:
+        await send({'type': 'http.response.start', 'status': 304, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    response_headers += [
+        (b'content-type', b'text/html; charset=utf-8'),
+        (b'content-length', str(len(content)).encode('latin-1')),
+    ]
+    if encoding:
+        response_headers.append((b'content-encoding', encoding.encode('latin-1')))
+    await send({'type': 'http.response.start', 'status': 200, 'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': content})
+
+
+async def _request_body(receive):
+    """Meneruskan body client per-chunk ke service internal."""
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+        more_body = message.get('more_body', False)
+        chunk = message.get('body', b'')
+        if chunk:
+            yield chunk
+
+
+async def forward_to_service(scope, receive, send, service_name, path, headers):
+    """Versi asyncio dari forward_to_service di app.py (selalu streaming)."""
+    if not SERVICE_URLS.get(service_name):
+        return await _send_json(send, {"error": f"Service '{service_name}' not configured"}, 500)
+
+    query_string = scope.get('query_string', b'').decode('latin-1')
+    target = path + (f"?{query_string}" if query_string else '')
+
+    upstream_headers = [
+        (k, v) for k, v in headers
+        if k != 'host' and (k not in EXCLUDED_HEADERS or k == 'content-length')
+    ]
+    has_body = any(k in ('content-length', 'transfer-encoding') for k, _ in headers)
+
+    # Deadline yang sama dengan gateway Flask, diteruskan ke service internal
+    deadline = request_deadline(next((v for k, v in headers if k == DEADLINE_HEADER.lower()), None))
+    upstream_headers = [(k, v) for k, v in upstream_headers if k != DEADLINE_HEADER.lower()]
+    upstream_headers.append((DEADLINE_HEADER, str(int(deadline * 1000))))
+    timeout = upstream_timeout(deadline)
+    if timeout is None:
+        return await _send_json(send, {"error": f"Service '{service_name}' timed out"}, 504)
+    connect_timeout, read_timeout = timeout
+
+    # Circuit breaker & bulkhead yang sama dengan gateway Flask
+    breaker = SERVICE_BREAKERS[service_name]
+    if not breaker.allow_request():
+        metrics.inc('gateway_upstream_errors_total', (('service', service_name), ('kind', 'circuit_open')))
+        return await _send_json(send, {"error": f"Service '{service_name}' is unavailable"}, 503,
+                                {"Retry-After": str(breaker.retry_after())})
+    if not _acquire_slot(service_name):
+        breaker.cancel_request()
+        metrics.inc('gateway_upstream_errors_total', (('service', service_name), ('kind', 'bulkhead_full')))
+        return await _send_json(send, {"error": f"Service '{service_name}' is unavailable"}, 503)
+
+    # Pemilihan replika memakai ReplicaSet yang sama dengan gateway Flask
+    replica_set = SERVICE_REPLICAS[service_name]
+    replica = replica_set.acquire()
+    client = _get_client(service_name)
+    upstream_request = client.build_request(
+        scope['method'],
+        f"{replica.url}/{target}",
+        headers=upstream_headers,
+        content=_request_body(receive) if has_body else None,
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout, pool=read_timeout),
+    )
+
+    success = False
+    started = time.perf_counter()
+    try:
+        try:
+            resp = await client.send(upstream_request, stream=True)
+        except httpx.ConnectTimeout:
+            return await _upstream_error(send, service_name, 'connection', 503, 'is unavailable')
+        except httpx.TimeoutException:
+            return await _upstream_error(send, service_name, 'timeout', 504, 'timed out')
+        except httpx.TransportError:
+            return await _upstream_error(send, service_name, 'connection', 503, 'is unavailable')
+        finally:
+            metrics.observe('gateway_upstream_duration_seconds', (('service', service_name),),
+                            time.perf_counter() - started)
+
+        # Respons 5xx dihitung sebagai kegagalan service
+        success = resp.status_code < 500
+        if success:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+            metrics.inc('gateway_upstream_errors_total', (('service', service_name), ('kind', 'http_5xx')))
+        try:
+            response_headers = [
+                (k.encode('latin-1'), v.encode('latin-1'))
+                for k, v in resp.headers.items()
+                if k.lower() not in EXCLUDED_HEADERS
+            ]
+            await send({
+                'type': 'http.response.start',
+                'status': resp.status_code,
+                'headers': response_headers + CORS_HEADERS,
+            })
+            async for chunk in resp.aiter_bytes(PROXY_STREAM_CHUNK_SIZE):
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            await resp.aclose()
+    finally:
+        _release_slot(service_name)
+        replica_set.release(replica, success)
+
+
+async def _upstream_error(send, service_name, kind, status, message):
+    SERVICE_BREAKERS[service_name].record_failure()
+    metrics.inc('gateway_upstream_errors_total', (('service', service_name), ('kind', kind)))
+    return await _send_json(send, {"error": f"Service '{service_name}' {message}"}, status)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await _close_clients()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """Entry point ASGI."""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    path = scope['path']
+    method = scope['method']
+    headers = [(k.decode('latin-1').lower(), v.decode('latin-1')) for k, v in scope['headers']]
+
+    # Preflight CORS dijawab langsung tanpa pemeriksaan token
+    if method == 'OPTIONS':
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': CORS_HEADERS + [
+                (b'access-control-allow-methods', b'GET, POST, PUT, DELETE, OPTIONS'),
+                (b'access-control-allow-headers', b'Authorization, Content-Type'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    auth_header = next((v for k, v in headers if k == 'authorization'), None)
+    statuses = []
+
+    async def send_and_record(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+        await send(message)
+
+    started = time.perf_counter()
+    try:
+        await _admit(scope, receive, send_and_record, path, method, headers, auth_header, statuses)
+    finally:
+        # Metrics request yang sama dengan record_request_metrics di app.py
+        status = statuses[0] if statuses else 500
+        labels = _metric_labels(_service_label(path), _route_label(path, status))
+        metrics.inc('gateway_requests_total', labels + (('method', method), ('status', str(status))))
+        metrics.observe('gateway_request_duration_seconds', labels, time.perf_counter() - started)
+
+
+def _route_label(path, status):
+    """Label route seperti app.py: path /api/ dinormalisasi, 404 menjadi 'unmatched'."""
+    if status == 404:
+        return 'unmatched'
+    if path.startswith('/api/'):
+        return normalize_api_path(path)
+    return path if path in KNOWN_PATHS else 'unmatched'
+
+
+async def _admit(scope, receive, send, path, method, headers, auth_header, statuses):
+    # Admission control yang sama dengan gateway Flask, sebelum validasi JWT
+    if not ADMISSION_CONTROL or not path.startswith('/api/'):
+        return await _handle(scope, receive, send, path, method, headers, auth_header)
+    if not admission_limiter.try_acquire(request_priority(method, path, auth_header)):
+        return await _send_json(send, *overloaded_result())
+
+    started = time.perf_counter()
+    try:
+        await _handle(scope, receive, send, path, method, headers, auth_header)
+    finally:
+        overloaded = not statuses or statuses[0] in (503, 504)
+        route = f'{method} {normalize_api_path(path)}'
+        admission_limiter.release(route, time.perf_counter() - started, overloaded)
+
+
+async def _handle(scope, receive, send, path, method, headers, auth_header):
+    """Validasi akses lalu routing request (setelah lolos admission control)."""
+    # Hook validasi JWT yang sama dengan gateway Flask
+    _, error = authenticate_request(path, auth_header)
+    if error:
+        body, status = error
+        return await _send_json(send, body, status)
+
+    if path == '/gateway/stats':
+        return await _send_json(send, {
+            "engine": "asgi",
+            "pid": os.getpid(),
+            "inFlight": _in_flight,
+            "admission": admission_limiter.snapshot(),
+            "replicas": {name: replicas.snapshot() for name, replicas in SERVICE_REPLICAS.items()},
+        }, 200)
+    if path == '/gateway/admin/breakers':
+        return await _send_json(send, {"pid": os.getpid(), "services": get_breaker_stats()}, 200)
+    if path == '/metrics':
+        body = render_metrics().encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/plain; version=0.0.4'),
+                (b'content-length', str(len(body)).encode('latin-1')),
+            ] + CORS_HEADERS,
+        })
+        await send({'type': 'http.response.body', 'body': body})
+        return
+
+    if path in STATIC_PAGES:
+        return await _send_static(send, STATIC_PAGES[path], headers)
+
+    service_name, service_path = _resolve_service(path)
+    if service_name is None or service_name not in SERVICE_URLS:
+        return await _send_json(send, {"error": "Not Found"}, 404)
+    if service_path == '' and method != 'GET':
+        return await _send_json(send, {"error": "Method Not Allowed"}, 405)
+    if method not in ('GET', 'HEAD', 'POST', 'PUT', 'DELETE'):
+        return await _send_json(send, {"error": "Method Not Allowed"}, 405)
+
+    return await forward_to_service(scope, receive, send, service_name, service_path, headers)
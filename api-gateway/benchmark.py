@@ -0,0 +1,146 @@
+"""
+Benchmark gateway sync (Flask + gunicorn) vs gateway ASGI (uvicorn)
+terhadap backend stub yang sama.
+
+Backend stub menjawab setiap request setelah jeda --delay detik, meniru
+service internal yang lambat. Kedua gateway diarahkan ke stub tersebut
+lalu dibebani --requests request dengan --concurrency request bersamaan.
+
+Contoh:
+    python benchmark.py --concurrency 1000 --requests 5000 --delay 0.5
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+import statistics
+
+import httpx
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+async def stub_backend(scope, receive, send):
+    """Service internal tiruan: tunggu STUB_DELAY detik lalu balas JSON."""
+    if scope['type'] != 'http':
+        return
+    await asyncio.sleep(float(os.environ.get('STUB_DELAY', 0.2)))
+    body = json.dumps({'total': 1, 'buses': [{'busId': 1}]}).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode('latin-1'))],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _start(cmd, env):
+    return subprocess.Popen(cmd, cwd=BASE_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _wait_ready(url, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server {url} tidak siap")
+
+
+async def _fetch(host, port, path):
+    """Satu request GET (Connection: close), return status code."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode('latin-1'))
+        await writer.drain()
+        data = await reader.read()
+        return int(data.split(b' ', 2)[1])
+    finally:
+        writer.close()
+
+
+async def _load(port, path, total, concurrency):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if await _fetch('127.0.0.1', port, path) != 200:
+                    errors += 1
+            except (OSError, ValueError, IndexError):
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'throughput': total / elapsed,
+        'p50': statistics.median(latencies),
+        'p99': latencies[int(len(latencies) * 0.99) - 1],
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--delay', type=float, default=0.2, help='jeda stub backend (detik)')
+    parser.add_argument('--sync-workers', type=int, default=4)
+    parser.add_argument('--sync-threads', type=int, default=1)
+    args = parser.parse_args()
+
+    stub_port, sync_port, asgi_port = 5990, 5991, 5992
+    env = dict(os.environ)
+    env['STUB_DELAY'] = str(args.delay)
+    env.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key-benchmark-secret')
+    for name in ('USER', 'ROUTE', 'STOP', 'BUS', 'SCHEDULE'):
+        env[f'{name}_SERVICE_URL'] = f'http://127.0.0.1:{stub_port}'
+
+    processes = [
+        _start([sys.executable, '-m', 'uvicorn', 'benchmark:stub_backend',
+                '--port', str(stub_port), '--log-level', 'warning'], env),
+        _start([sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{sync_port}',
+                '--workers', str(args.sync_workers), '--threads', str(args.sync_threads),
+                'app:app'], env),
+        _start([sys.executable, '-m', 'uvicorn', 'asgi:app',
+                '--port', str(asgi_port), '--log-level', 'warning'], env),
+    ]
+    try:
+        for port in (stub_port, sync_port, asgi_port):
+            _wait_ready(f'http://127.0.0.1:{port}/')
+
+        print(f"{args.requests} request, concurrency {args.concurrency}, "
+              f"delay backend {args.delay}s")
+        print(f"{'gateway':<28}{'req/s':>10}{'p50 (s)':>10}{'p99 (s)':>10}{'error':>8}")
+        engines = [
+            (f'sync ({args.sync_workers}w x {args.sync_threads}t)', sync_port),
+            ('asgi (1 proses)', asgi_port),
+        ]
+        for label, port in engines:
+            result = asyncio.run(_load(port, '/api/bus/buses', args.requests, args.concurrency))
+            print(f"{label:<28}{result['throughput']:>10.1f}{result['p50']:>10.3f}"
+                  f"{result['p99']:>10.3f}{result['errors']:>8}")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
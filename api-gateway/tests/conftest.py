@@ -0,0 +1,9 @@
+import os
+import sys
+
+# app.py membaca konfigurasi saat di-import
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-for-gateway-tests!")
+for name in ("USER", "ROUTE", "STOP", "BUS", "SCHEDULE"):
+    os.environ.setdefault(f"{name}_SERVICE_URL", "http://127.0.0.1:9")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,74 @@
+import time
+
+import jwt
+
+import app as gateway
+
+
+def _limiter(initial=20):
+    return gateway.AdaptiveLimiter(initial, gateway.ADMISSION_MIN_LIMIT, gateway.ADMISSION_MAX_LIMIT)
+
+
+def _run(limiter, route, latency, count):
+    """Selesaikan `count` request pada route dengan latensi tetap, limit terpakai penuh."""
+    for _ in range(count):
+        while limiter.in_flight < limiter.limit:
+            limiter.in_flight += 1
+        limiter.release(route, latency)
+        limiter.in_flight = 0
+
+
+def test_slow_but_normal_route_does_not_shrink_limit():
+    limiter = _limiter()
+    _run(limiter, 'POST /api/user/login', 0.6, 50)
+    _run(limiter, 'GET /api/route/routes', 0.005, 50)
+
+    assert limiter.limit >= 20
+
+
+def test_route_slower_than_its_baseline_shrinks_limit():
+    limiter = _limiter()
+    _run(limiter, 'GET /api/route/routes', 0.02, 20)
+    before = limiter.limit
+
+    _run(limiter, 'GET /api/route/routes', 0.5, 5)
+
+    assert limiter.limit < before
+
+
+def test_limit_grows_by_one_per_full_window():
+    limiter = _limiter()
+    _run(limiter, 'GET /api/route/routes', 0.005, 20)
+
+    assert 20.9 < limiter.limit < 21.1
+
+
+def _bearer(payload):
+    token = jwt.encode(payload, gateway.app.config['JWT_SECRET_KEY'], algorithm='HS256')
+    return token, f'Bearer {token}'
+
+
+def test_unverified_token_gets_lowest_priority(monkeypatch):
+    monkeypatch.setattr(gateway, 'token_cache', gateway.TokenCache(100))
+    forged = 'Bearer ' + jwt.encode({'sub': 'x', 'role': 'admin'}, 'wrong-key-' * 4, algorithm='HS256')
+
+    assert gateway.request_priority('POST', '/api/route/admin/routes/add', forged) == gateway.PRIORITY_PUBLIC
+
+
+def test_verified_admin_token_gets_critical_priority(monkeypatch):
+    monkeypatch.setattr(gateway, 'token_cache', gateway.TokenCache(100))
+    _, header = _bearer({'sub': 'a', 'role': 'admin', 'exp': int(time.time()) + 600})
+    assert gateway.request_priority('POST', '/api/route/admin/routes/add', header) == gateway.PRIORITY_PUBLIC
+
+    gateway.verify_auth_header(header)
+
+    assert gateway.request_priority('POST', '/api/route/admin/routes/add', header) == gateway.PRIORITY_CRITICAL
+    assert gateway.request_priority('GET', '/api/route/routes', header) == gateway.PRIORITY_USER
+
+
+def test_verified_user_token_cannot_claim_admin_priority(monkeypatch):
+    monkeypatch.setattr(gateway, 'token_cache', gateway.TokenCache(100))
+    _, header = _bearer({'sub': 'u', 'role': 'user', 'exp': int(time.time()) + 600})
+    gateway.verify_auth_header(header)
+
+    assert gateway.request_priority('POST', '/api/route/admin/routes/add', header) == gateway.PRIORITY_USER
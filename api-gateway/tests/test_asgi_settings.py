@@ -0,0 +1,14 @@
+import importlib
+import sys
+
+import pytest
+
+
+def test_asgi_refuses_features_it_does_not_implement():
+    sys.modules.pop('asgi', None)
+    with pytest.raises(RuntimeError) as excinfo:
+        importlib.import_module('asgi')
+
+    message = str(excinfo.value)
+    assert 'COALESCE_GETS=False' in message
+    assert 'HEDGE_GETS=False' in message
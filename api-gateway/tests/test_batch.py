@@ -0,0 +1,60 @@
+import time
+
+import pytest
+from flask import jsonify, request
+
+import app as gateway
+
+
+@pytest.fixture
+def seen(monkeypatch):
+    """Ganti forward_to_service dengan versi yang mencatat request yang diterima."""
+    calls = []
+
+    def fake_forward(service_name, path):
+        calls.append({
+            'service': service_name,
+            'path': path,
+            'query': request.query_string.decode(),
+            'deadline': int(request.headers[gateway.DEADLINE_HEADER]) / 1000.0,
+        })
+        return jsonify({"ok": True})
+
+    monkeypatch.setattr(gateway, 'forward_to_service', fake_forward)
+    return calls
+
+
+def _batch(requests, headers=None):
+    client = gateway.app.test_client()
+    return client.post('/api/batch', json={"requests": requests}, headers=headers or {})
+
+
+def test_query_in_path_is_merged_with_query_field(seen):
+    response = _batch([
+        {"id": "a", "path": "/api/route/routes?page=1"},
+        {"id": "b", "path": "/api/route/routes?page=2", "query": "size=5"},
+        {"id": "c", "path": "/api/route/routes", "query": {"page": 3}},
+    ])
+
+    assert [item["status"] for item in response.json["responses"]] == [200, 200, 200]
+    assert sorted(call['query'] for call in seen) == ['page=1', 'page=2&size=5', 'page=3']
+    assert all(call['path'] == 'routes' for call in seen)
+
+
+def test_invalid_query_is_rejected_per_item(seen):
+    response = _batch([
+        {"id": "bad", "path": "/api/route/routes", "query": ["x"]},
+        {"id": "ok", "path": "/api/route/routes"},
+    ])
+
+    assert [item["status"] for item in response.json["responses"]] == [400, 200]
+
+
+def test_sub_requests_inherit_batch_deadline(seen):
+    deadline = time.time() + 2
+    _batch([{"path": "/api/route/routes"}, {"path": "/api/stop/stops"}],
+           headers={gateway.DEADLINE_HEADER: str(int(deadline * 1000))})
+
+    assert len(seen) == 2
+    for call in seen:
+        assert call['deadline'] <= deadline + 0.001
@@ -0,0 +1,51 @@
+import time
+
+import app as gateway
+
+KEY = ('GET', '/api/bus/buses', '')
+
+
+def _caches(tmp_path):
+    """Dua cache yang berbagi direktori stempel, seperti dua worker gunicorn."""
+    return (gateway.ResponseCache(1024 * 1024, str(tmp_path)),
+            gateway.ResponseCache(1024 * 1024, str(tmp_path)))
+
+
+def test_write_in_one_worker_invalidates_other_workers(tmp_path):
+    worker_a, worker_b = _caches(tmp_path)
+    worker_b.set(KEY, 200, [], b'[]', ttl=60)
+    assert worker_b.get(KEY) is not None
+
+    worker_a.invalidate_prefix('/api/bus/')
+
+    assert worker_b.get(KEY) is None
+    assert worker_b.invalidations == 1
+
+
+def test_response_fetched_after_invalidation_stays_cached(tmp_path):
+    worker_a, worker_b = _caches(tmp_path)
+    worker_a.invalidate_prefix('/api/bus/')
+
+    worker_b.set(KEY, 200, [], b'[]', ttl=60, fetched_at=time.time_ns())
+
+    assert worker_b.get(KEY) is not None
+
+
+def test_response_fetched_before_invalidation_is_not_served(tmp_path):
+    worker_a, worker_b = _caches(tmp_path)
+    fetched_at = time.time_ns()
+    worker_a.invalidate_prefix('/api/bus/')
+
+    # Respons upstream tiba setelah penulisan di worker lain
+    worker_b.set(KEY, 200, [], b'[]', ttl=60, fetched_at=fetched_at)
+
+    assert worker_b.get(KEY) is None
+
+
+def test_other_services_are_not_invalidated(tmp_path):
+    worker_a, worker_b = _caches(tmp_path)
+    worker_b.set(KEY, 200, [], b'[]', ttl=60)
+
+    worker_a.invalidate_prefix('/api/route/')
+
+    assert worker_b.get(KEY) is not None
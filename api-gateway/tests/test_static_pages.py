@@ -0,0 +1,13 @@
+import app as gateway
+
+
+def test_html_is_revalidated_with_etag():
+    client = gateway.app.test_client()
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    etag = response.headers['ETag']
+
+    revalidated = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert revalidated.status_code == 304
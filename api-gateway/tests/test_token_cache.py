@@ -0,0 +1,53 @@
+import time
+
+import jwt
+import pytest
+
+import app as gateway
+
+
+def _token(payload):
+    return jwt.encode(payload, gateway.app.config['JWT_SECRET_KEY'], algorithm='HS256')
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Jam palsu untuk time.time() yang bisa dimajukan oleh test."""
+    now = [time.time()]
+    monkeypatch.setattr(gateway.time, 'time', lambda: now[0])
+    monkeypatch.setattr(gateway, 'token_cache', gateway.TokenCache(100))
+    return now
+
+
+def test_cache_ttl_passing_is_a_miss_not_an_expired_token(clock):
+    token = _token({'sub': 'a', 'role': 'user', 'exp': int(clock[0]) + 1800})
+    assert gateway.verify_auth_header(f'Bearer {token}')[1] is None
+
+    clock[0] += gateway.JWT_CACHE_MAX_TTL + 1
+    payload, error = gateway.verify_auth_header(f'Bearer {token}')
+
+    assert error is None
+    assert payload['sub'] == 'a'
+    assert gateway.token_cache.expired == 0
+
+
+def test_token_past_exp_is_rejected_from_cache(clock):
+    token = _token({'sub': 'a', 'role': 'user', 'exp': int(clock[0]) + 60})
+    assert gateway.verify_auth_header(f'Bearer {token}')[1] is None
+
+    clock[0] += 61
+    payload, error = gateway.verify_auth_header(f'Bearer {token}')
+
+    assert payload is None
+    assert error == ({"error": "Token has expired"}, 401)
+
+
+def test_token_without_exp_is_decoded_again_after_cache_ttl(clock):
+    token = _token({'sub': 'a', 'role': 'user'})
+    assert gateway.verify_auth_header(f'Bearer {token}')[1] is None
+    assert gateway.verify_auth_header(f'Bearer {token}')[1] is None
+    assert gateway.token_cache.hits == 1
+
+    clock[0] += gateway.JWT_CACHE_MAX_TTL + 1
+    assert gateway.verify_auth_header(f'Bearer {token}')[1] is None
+    assert gateway.token_cache.misses == 2
@@ -2,12 +2,17 @@ import os
 from flask import Flask, jsonify, request, render_template
 from flask_sqlalchemy import SQLAlchemy
 from dotenv import load_dotenv
-from functools import wraps
-from math import radians, cos, sin, asin, sqrt
-import requests
+from sqlalchemy import event, insert, update, delete
+from sqlalchemy.orm import selectinload, object_session
+from math import radians, cos, sin, asin, sqrt, isfinite
 
 # Import models
 from models import db, Route, RouteStop
+from deadline import init_app as init_deadline
+# Verifikasi token admin lokal (tanpa memanggil service-user tiap request)
+from auth import admin_required
+from fts import FullTextIndex
+from journey import journey_graph, JOURNEY_MAX_TRANSFERS
 
 # Muat variabel lingkungan
 load_dotenv()
@@ -25,35 +30,17 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # URL Bus Service (untuk integrasi)
 BUS_SERVICE_URL = os.environ.get('BUS_SERVICE_URL', 'http://localhost:5004')
 
+# Jumlah maksimal hasil pencarian /routes/search
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 50))
+
 # Inisialisasi Database
 db.init_app(app)
 
-# --- Middleware untuk Autentikasi Admin ---
-def admin_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        # Dapatkan token dari header
-        token = request.headers.get('Authorization')
-        
-        if not token:
-            return jsonify({'error': 'Token tidak ditemukan'}), 401
-
-        try:
-            # Verifikasi token admin ke service-user
-            response = requests.get(
-                'http://service-user:5001/verify-admin',
-                headers={'Authorization': token}  # Kirim token yang sama
-            )
-            
-            if response.status_code != 200:
-                return jsonify({'error': 'Unauthorized - Admin role required'}), 403
-                
-        except requests.exceptions.RequestException:
-            return jsonify({'error': 'Gagal terhubung ke service autentikasi'}), 500
-            
-        return f(*args, **kwargs)
-    return decorated_function
+# Index full-text nama & deskripsi rute (SQLite FTS5); nama lebih berbobot
+route_search_index = FullTextIndex('routes', ['name', 'description'], weights=[10.0, 1.0])
 
+# Hentikan pekerjaan untuk request yang deadline-nya (dari gateway) sudah lewat
+init_deadline(app)
 
 # --- Helper Function: Haversine Distance ---
 def haversine_distance(lat1, lon1, lat2, lon2):
@@ -76,6 +63,37 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     return c * r
 
 
+def get_route_with_stops(route_id):
+    """Rute beserta halte-haltenya (terurut) dalam dua query, atau None."""
+    return db.session.get(Route, route_id, options=[selectinload(Route.route_stops)])
+
+
+# --- Sinkronisasi Graf Perjalanan ---
+# Rute yang berubah dicatat di session dan baru ditandai dirty setelah commit,
+# agar graf tidak memuat data yang akhirnya di-rollback.
+@event.listens_for(Route, 'after_insert')
+@event.listens_for(Route, 'after_update')
+@event.listens_for(Route, 'after_delete')
+@event.listens_for(RouteStop, 'after_insert')
+@event.listens_for(RouteStop, 'after_update')
+@event.listens_for(RouteStop, 'after_delete')
+def _track_changed_route(mapper, connection, target):
+    route_id = target.id if isinstance(target, Route) else target.route_id
+    object_session(target).info.setdefault('dirty_routes', set()).add(route_id)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _mark_committed_routes(session):
+    route_ids = session.info.pop('dirty_routes', None)
+    if route_ids:
+        journey_graph.mark_dirty(route_ids)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_changed_routes(session):
+    session.info.pop('dirty_routes', None)
+
+
 # ========================================
 # WEB UI ENDPOINT
 # ========================================
@@ -110,7 +128,7 @@ def get_route_detail(routeId):
     """
     GET /routes/{routeId}: Mendapatkan detail rute termasuk daftar halte.
     """
-    route = db.session.get(Route, routeId)
+    route = get_route_with_stops(routeId)
     if not route:
         return jsonify({'error': 'Rute tidak ditemukan.'}), 404
     
@@ -122,21 +140,57 @@ def get_route_stops(routeId):
     """
     GET /routes/{routeId}/stops: Mendapatkan urutan halte pada rute tertentu.
     """
-    route = db.session.get(Route, routeId)
+    route = get_route_with_stops(routeId)
     if not route:
         return jsonify({'error': 'Rute tidak ditemukan.'}), 404
     
-    # Ambil semua route_stops yang sudah terurut
-    stops = route.route_stops
-    
+    # Halte sudah terurut berdasarkan sequence_order; total diambil dari agregat rute
     return jsonify({
         'routeId': route.id,
         'routeName': route.name,
         'origin': route.origin,
         'destination': route.destination,
-        'totalStops': len(stops),
-        'totalDistance': sum(rs.distance_to_next for rs in stops if rs.distance_to_next),
-        'stops': [stop.to_dict() for stop in stops]
+        'totalStops': route.stop_count,
+        'totalDistance': route.total_distance,
+        'totalTime': route.total_time,
+        'stops': [rs.to_dict() for rs in route.route_stops]
+    }), 200
+
+
+@app.route('/routes/<int:routeId>/offsets', methods=['GET'])
+def get_route_offset(routeId):
+    """
+    GET /routes/{routeId}/offsets?from=stopId&to=stopId: Jarak, waktu tempuh,
+    dan jumlah halte antara dua halte pada rute (searah urutan rute).
+    Dihitung dari nilai kumulatif, tanpa menjumlah halte di antaranya.
+    """
+    try:
+        from_stop = int(request.args['from'])
+        to_stop = int(request.args['to'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Parameter from dan to (stopId) wajib diisi dan harus berupa angka.'}), 400
+    
+    route_stops = RouteStop.query.filter(
+        RouteStop.route_id == routeId,
+        RouteStop.stop_id.in_([from_stop, to_stop])
+    ).order_by(RouteStop.sequence_order).all()
+    
+    # Kemunculan pertama halte asal, lalu halte tujuan pertama setelahnya
+    start = next((rs for rs in route_stops if rs.stop_id == from_stop), None)
+    if start is None:
+        return jsonify({'error': f'Halte {from_stop} tidak ada di rute ini.'}), 404
+    end = next((rs for rs in route_stops
+                if rs.stop_id == to_stop and rs.sequence_order >= start.sequence_order), None)
+    if end is None:
+        return jsonify({'error': f'Halte {to_stop} tidak dilalui setelah halte {from_stop} di rute ini.'}), 404
+    
+    return jsonify({
+        'routeId': routeId,
+        'from': start.to_dict(),
+        'to': end.to_dict(),
+        'stops': end.sequence_order - start.sequence_order,
+        'distance': end.cumulative_distance - start.cumulative_distance,
+        'time': end.cumulative_time - start.cumulative_time
     }), 200
 
 @app.route('/routes/search', methods=['GET'])
@@ -148,14 +202,21 @@ def search_routes():
     if not query_text:
         return jsonify({'error': 'Parameter query wajib diisi.'}), 400
     
-    # Mencari rute yang namanya atau deskripsinya mengandung query_text
-    routes = Route.query.filter(
-        db.or_(
-            Route.name.ilike(f'%{query_text}%'),
-            Route.description.ilike(f'%{query_text}%')
-        ),
-        Route.is_active == True
-    ).all()
+    # Index FTS: prefix per kata, tanpa beda aksen, terurut relevansi
+    ids = route_search_index.search_ids(db.session, query_text, SEARCH_MAX_RESULTS,
+                                        where='t.is_active = 1')
+    if ids is not None:
+        by_id = {route.id: route for route in Route.query.filter(Route.id.in_(ids))}
+        routes = [by_id[route_id] for route_id in ids if route_id in by_id]
+    else:
+        # Fallback untuk database tanpa FTS5 (misal DATABASE_URL non-SQLite)
+        routes = Route.query.filter(
+            db.or_(
+                Route.name.ilike(f'%{query_text}%'),
+                Route.description.ilike(f'%{query_text}%')
+            ),
+            Route.is_active == True
+        ).limit(SEARCH_MAX_RESULTS).all()
     
     return jsonify({
         'query': query_text,
@@ -163,6 +224,45 @@ def search_routes():
         'routes': [route.to_dict() for route in routes]
     }), 200
 
+@app.route('/journeys', methods=['GET'])
+def plan_journey():
+    """
+    GET /journeys?from=stopId&to=stopId[&maxTransfers=n]: Mencari perjalanan
+    antar halte, termasuk berpindah rute. Mengembalikan pilihan tercepat
+    untuk setiap jumlah transit (yang lebih banyak transit hanya jika lebih cepat).
+    """
+    try:
+        origin = int(request.args['from'])
+        target = int(request.args['to'])
+        max_transfers = int(request.args.get('maxTransfers', JOURNEY_MAX_TRANSFERS))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Parameter from dan to (stopId) wajib diisi dan harus berupa angka.'}), 400
+    
+    if origin == target:
+        return jsonify({'error': 'Halte asal dan tujuan tidak boleh sama.'}), 400
+    
+    journey_graph.refresh()
+    for stop_id in (origin, target):
+        if not journey_graph.has_stop(stop_id):
+            return jsonify({'error': f'Halte {stop_id} tidak dilalui rute aktif mana pun.'}), 404
+    
+    max_transfers = max(0, min(max_transfers, JOURNEY_MAX_TRANSFERS))
+    journeys = journey_graph.plan(origin, target, max_transfers)
+    
+    return jsonify({
+        'from': {'stopId': origin, 'stopName': journey_graph.stop_name(origin)},
+        'to': {'stopId': target, 'stopName': journey_graph.stop_name(target)},
+        'total': len(journeys),
+        'journeys': journeys
+    }), 200
+
+
+@app.route('/journeys/stats', methods=['GET'])
+def journey_graph_stats():
+    """GET /journeys/stats: Ukuran graf perjalanan dan jumlah pembangunan ulang."""
+    return jsonify(journey_graph.stats()), 200
+
+
 # ========================================
 # ENDPOINTS UNTUK ADMIN (CRUD)
 # ========================================
@@ -173,7 +273,8 @@ def admin_get_all_routes():
     """
     GET /admin/routes: Admin dapat melihat semua rute (termasuk yang tidak aktif).
     """
-    routes = Route.query.all()
+    # Semua halte dimuat dalam satu query tambahan (bukan satu query per rute)
+    routes = Route.query.options(selectinload(Route.route_stops)).all()
     
     return jsonify({
         'total': len(routes),
@@ -225,6 +326,7 @@ def admin_add_route():
             )
             db.session.add(route_stop)
     
+    new_route.refresh_aggregates()
     db.session.commit()
     
     return jsonify({
@@ -342,6 +444,7 @@ def admin_add_stop_to_route(routeId):
     )
     
     db.session.add(route_stop)
+    route.refresh_aggregates()
     db.session.commit()
     
     return jsonify({
@@ -360,7 +463,9 @@ def admin_delete_route_stop(routeId, routeStopId):
         return jsonify({'error': 'Route stop tidak ditemukan.'}), 404
     
     stop_name = route_stop.stop_name
+    route = route_stop.route
     db.session.delete(route_stop)
+    route.refresh_aggregates()
     db.session.commit()
     
     return jsonify({
@@ -368,18 +473,227 @@ def admin_delete_route_stop(routeId, routeStopId):
     }), 200
 
 
+def replace_route_stops(route, entries):
+    """
+    Ganti seluruh daftar halte rute dengan `entries` (urut) memakai diff
+    terhadap RouteStop yang ada: baris yang tidak berubah tidak ditulis,
+    sisanya ditulis dengan satu statement per jenis (DELETE, UPDATE, INSERT).
+    Baris dicocokkan lewat routeStopId jika diberikan, lalu lewat stopId.
+    Return jumlah baris per jenis perubahan; commit dilakukan pemanggil.
+    """
+    current = RouteStop.query.filter_by(route_id=route.id).order_by(RouteStop.sequence_order).all()
+    by_id = {rs.id: rs for rs in current}
+    
+    # Cocokkan routeStopId eksplisit dulu, baru sisanya berdasarkan stopId (urut kemunculan)
+    matches = [None] * len(entries)
+    for index, entry in enumerate(entries):
+        if entry.get('routeStopId') is not None:
+            matches[index] = by_id.pop(entry['routeStopId'], None)
+            if matches[index] is None:
+                raise ValueError(f'Route stop {entry["routeStopId"]} tidak ada di rute ini atau dipakai dua kali.')
+    by_stop = {}
+    for rs in by_id.values():
+        by_stop.setdefault(rs.stop_id, []).append(rs)
+    for index, entry in enumerate(entries):
+        if matches[index] is None and by_stop.get(entry['stopId']):
+            matches[index] = by_stop[entry['stopId']].pop(0)
+    
+    # Nilai akhir tiap baris, termasuk nilai kumulatif (sama dengan Route.refresh_aggregates)
+    distance = 0
+    elapsed = 0
+    moved, updated, added = [], [], []
+    kept = set()
+    for sequence, (entry, existing) in enumerate(zip(entries, matches), start=1):
+        values = {
+            'stop_id': entry['stopId'],
+            'stop_name': entry['stopName'],
+            'sequence_order': sequence,
+            'distance_to_next': entry.get('distanceToNext'),
+            'time_to_next': entry.get('timeToNext'),
+            'cumulative_distance': distance,
+            'cumulative_time': elapsed
+        }
+        distance += values['distance_to_next'] or 0
+        elapsed += values['time_to_next'] or 0
+        
+        if existing is None:
+            added.append(dict(values, route_id=route.id))
+            continue
+        kept.add(existing.id)
+        if any(getattr(existing, key) != value for key, value in values.items()):
+            updated.append(dict(values, id=existing.id))
+            if existing.sequence_order != sequence:
+                # Pindah dulu ke urutan sementara (negatif) agar tidak bentrok
+                # dengan unique_route_sequence saat urutan ditukar
+                moved.append({'id': existing.id, 'sequence_order': -sequence})
+    removed = [rs.id for rs in current if rs.id not in kept]
+    
+    if removed:
+        db.session.execute(delete(RouteStop).where(RouteStop.id.in_(removed)))
+    if moved:
+        db.session.execute(update(RouteStop), moved)
+    if updated:
+        db.session.execute(update(RouteStop), updated)
+    if added:
+        db.session.execute(insert(RouteStop), added)
+    
+    route.stop_count = len(entries)
+    route.total_distance = distance
+    route.total_time = elapsed
+    # Statement massal tidak memicu event mapper; tandai graf perjalanan secara manual
+    db.session.info.setdefault('dirty_routes', set()).add(route.id)
+    
+    return {
+        'unchanged': len(kept) - len(updated),
+        'updated': len(updated),
+        'added': len(added),
+        'removed': len(removed)
+    }
+
+
+def _is_number(value):
+    # bool adalah subclass int, tapi true/false bukan angka yang sah di payload;
+    # NaN/Infinity juga diterima parser JSON Python tapi bukan jarak/waktu yang sah
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and isfinite(value)
+
+
+def stop_entry_error(entry, position):
+    """
+    Periksa satu baris payload PUT /admin/routes/{routeId}/stops.
+    Return pesan error (dengan nomor baris) atau None jika baris valid.
+    """
+    if not isinstance(entry, dict):
+        return f'Halte ke-{position} harus berupa object.'
+    for field in ('stopId', 'stopName'):
+        if field not in entry:
+            return f'Field {field} wajib diisi (halte ke-{position}).'
+    for field in ('routeStopId', 'stopId'):
+        value = entry.get(field)
+        if value is not None and not (isinstance(value, int) and not isinstance(value, bool)):
+            return f'Field {field} harus berupa bilangan bulat (halte ke-{position}).'
+    if entry['stopId'] is None:
+        return f'Field stopId wajib diisi (halte ke-{position}).'
+    name = entry['stopName']
+    if not isinstance(name, str) or not name.strip() or len(name) > 100:
+        return f'Field stopName harus berupa teks 1-100 karakter (halte ke-{position}).'
+    for field in ('distanceToNext', 'timeToNext'):
+        value = entry.get(field)
+        if value is not None and not (_is_number(value) and value >= 0):
+            return f'Field {field} harus berupa angka tidak negatif (halte ke-{position}).'
+    return None
+
+
+@app.route('/admin/routes/<int:routeId>/stops', methods=['PUT'])
+@admin_required
+def admin_replace_route_stops(routeId):
+    """
+    PUT /admin/routes/{routeId}/stops: Mengganti seluruh urutan halte rute
+    dalam satu transaksi (menambah, menghapus, dan mengurutkan ulang sekaligus).
+    Body JSON:
+    {
+        "stops": [
+            {"stopId": 2, "stopName": "Masjid Jami Baitul Huda Baleendah", "distanceToNext": 1.0, "timeToNext": 3},
+            {"routeStopId": 7, "stopId": 5, "stopName": "Museum Kota Bandung"}
+        ]
+    }
+    """
+    route = db.session.get(Route, routeId)
+    if not route:
+        return jsonify({'error': 'Rute tidak ditemukan.'}), 404
+    
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('stops'), list):
+        return jsonify({'error': 'Body harus berupa JSON dengan field stops (list).'}), 400
+    
+    # Validasi seluruh baris dulu supaya payload rusak tidak mengubah apa pun
+    seen_route_stop_ids = set()
+    for position, entry in enumerate(data['stops'], start=1):
+        error = stop_entry_error(entry, position)
+        if error is None and entry.get('routeStopId') is not None:
+            if entry['routeStopId'] in seen_route_stop_ids:
+                error = f'routeStopId {entry["routeStopId"]} dipakai dua kali (halte ke-{position}).'
+            seen_route_stop_ids.add(entry['routeStopId'])
+        if error:
+            return jsonify({'error': error}), 400
+    
+    try:
+        changes = replace_route_stops(route, data['stops'])
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Urutan halte rute berhasil diperbarui.',
+        'changes': changes,
+        'route': route.to_dict(include_stops=True)
+    }), 200
+
+
 # ========================================
 # CLI COMMANDS
 # ========================================
 
+def add_missing_columns():
+    """
+    Tambahkan kolom baru model ke tabel yang sudah ada di database lama
+    (db.create_all tidak mengubah tabel yang sudah ada). Return nama kolom yang ditambahkan.
+    """
+    inspector = db.inspect(db.engine)
+    added = []
+    for table in (Route.__table__, RouteStop.__table__):
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            default = f' DEFAULT {column.server_default.arg}' if column.server_default is not None else ''
+            not_null = ' NOT NULL' if not column.nullable and default else ''
+            db.session.execute(db.text(
+                f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{not_null}{default}'))
+            added.append(f'{table.name}.{column.name}')
+    db.session.commit()
+    return added
+
+
+def recompute_all_route_aggregates():
+    routes = Route.query.all()
+    for route in routes:
+        route.refresh_aggregates()
+    db.session.commit()
+    return len(routes)
+
+
 @app.cli.command('init-db')
 def init_db_command():
     """Perintah untuk menginisialisasi database."""
     with app.app_context():
         db.create_all()
+        if add_missing_columns():
+            # Database lama: isi agregat untuk kolom yang baru ditambahkan
+            recompute_all_route_aggregates()
+        route_search_index.create(db.session)
         print('Database Route telah diinisialisasi.')
 
 
+@app.cli.command('recompute-route-aggregates')
+def recompute_route_aggregates_command():
+    """Hitung ulang jumlah halte, total jarak/waktu, dan nilai kumulatif semua rute."""
+    with app.app_context():
+        total = recompute_all_route_aggregates()
+        print(f'Agregat {total} rute telah dihitung ulang.')
+
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Bangun ulang index full-text rute dari tabel routes."""
+    with app.app_context():
+        if route_search_index.rebuild(db.session):
+            print('Index pencarian rute telah dibangun ulang.')
+        else:
+            print('FTS5 tidak tersedia; pencarian memakai ilike.')
+
+
 @app.cli.command('seed-routes')
 def seed_routes_command():
     """
@@ -484,6 +798,8 @@ def seed_routes_command():
             )
             db.session.add(route_stop)
         
+        for route in (route_a, route_b, route_c):
+            route.refresh_aggregates()
         db.session.commit()
         print('3 Rute berhasil ditambahkan dengan total halte dan jarak 1 km antar halte.')
 
@@ -499,5 +815,6 @@ def health_check():
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        route_search_index.create(db.session)
     # Port 5002 untuk route service
     app.run(debug=True, host='0.0.0.0', port=5002)
@@ -0,0 +1,133 @@
+"""
+Index full-text (SQLite FTS5) untuk endpoint pencarian.
+
+Tabel FTS5 dibuat sebagai external content table: teksnya tetap di tabel
+asli, FTS hanya menyimpan index. Trigger INSERT/UPDATE/DELETE menjaga index
+tetap sinkron, termasuk untuk perubahan lewat query massal atau CLI seed.
+Tokenizer unicode61 dengan remove_diacritics 2 membuat pencarian tidak peka
+huruf besar/kecil maupun aksen ("cipaganti" cocok dengan "Cipagantí"), dan
+index prefix 2-3 huruf mempercepat pencarian saat pengguna baru mengetik.
+
+Jika database bukan SQLite atau FTS5 tidak tersedia, search_ids()
+mengembalikan None dan pemanggil memakai pencarian ilike biasa.
+
+File ini identik di setiap service (build context Docker terpisah per service).
+"""
+import re
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def match_expression(query_text):
+    """
+    Ubah input pengguna menjadi query MATCH FTS5: setiap kata menjadi prefix
+    query ("band"* "ala"*) dan semua kata harus ada. None jika tidak ada kata.
+    """
+    tokens = _TOKEN_RE.findall(query_text or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+class FullTextIndex:
+    """Index FTS5 untuk beberapa kolom teks dari satu tabel (rowid = kolom id)."""
+
+    def __init__(self, table, columns, weights=None):
+        self.table = table
+        self.columns = columns
+        self.fts_table = f'{table}_fts'
+        # Bobot bm25 per kolom (kolom pertama biasanya nama, dibuat lebih penting)
+        self.weights = weights or [1.0] * len(columns)
+        self._available = False
+
+    def _ddl(self):
+        cols = ', '.join(self.columns)
+        new_cols = ', '.join(f'new.{c}' for c in self.columns)
+        old_cols = ', '.join(f'old.{c}' for c in self.columns)
+        fts, table = self.fts_table, self.table
+        # Trigger dibuat ulang agar definisinya selalu mengikuti kode ini
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', "
+            f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            f"DROP TRIGGER IF EXISTS {fts}_ai",
+            f"DROP TRIGGER IF EXISTS {fts}_ad",
+            f"DROP TRIGGER IF EXISTS {fts}_au",
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END",
+            # Hanya saat kolom yang di-index berubah, bukan setiap UPDATE pada tabel
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+        ]
+
+    def create(self, session):
+        """
+        Buat tabel FTS dan trigger (idempotent). Jika tabel FTS baru dibuat
+        di atas data yang sudah ada, index langsung diisi; index yang kosong
+        akan rusak saat trigger menghapus baris lama darinya.
+        Return False jika backend tidak mendukung.
+        """
+        if session.get_bind().dialect.name != 'sqlite':
+            return False
+        try:
+            existed = self._exists(session)
+            for statement in self._ddl():
+                session.execute(text(statement))
+            if not existed:
+                session.execute(text(f"INSERT INTO {self.fts_table}({self.fts_table}) VALUES ('rebuild')"))
+            session.commit()
+        except OperationalError:
+            # SQLite tanpa modul FTS5
+            session.rollback()
+            return False
+        self._available = True
+        return True
+
+    def _exists(self, session):
+        return session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': self.fts_table},
+        ).first() is not None
+
+    def rebuild(self, session):
+        """Bangun ulang isi index dari tabel asli (misal setelah import data lama)."""
+        if not self.create(session):
+            return False
+        session.execute(text(f"INSERT INTO {self.fts_table}({self.fts_table}) VALUES ('rebuild')"))
+        session.commit()
+        return True
+
+    def available(self, session):
+        """Cek sekali per proses apakah tabel FTS sudah dibuat (init-db)."""
+        if not self._available and session.get_bind().dialect.name == 'sqlite':
+            self._available = self._exists(session)
+        return self._available
+
+    def search_ids(self, session, query_text, limit, where=None):
+        """
+        Id baris yang cocok, terurut dari yang paling relevan (bm25). `where`
+        adalah filter SQL tambahan pada tabel asli (alias t), misal
+        "t.is_active = 1"; filter diterapkan sebelum LIMIT sehingga baris yang
+        tersaring tidak mengurangi jumlah hasil. None jika index tidak bisa
+        dipakai dan pemanggil harus memakai fallback.
+        """
+        expression = match_expression(query_text)
+        if expression is None or not self.available(session):
+            return None
+        fts = self.fts_table
+        weights = ', '.join(str(w) for w in self.weights)
+        extra = f' AND {where}' if where else ''
+        # SQLite hanya menyimpan `limit` skor terbaik saat mengurutkan (top-N),
+        # jadi memori tetap kecil walaupun kata yang umum cocok dengan banyak baris
+        rows = session.execute(
+            text(f"SELECT t.id FROM {fts} JOIN {self.table} t ON t.id = {fts}.rowid "
+                 f"WHERE {fts} MATCH :query{extra} "
+                 f"ORDER BY bm25({fts}, {weights}) LIMIT :limit"),
+            {'query': expression, 'limit': limit},
+        )
+        return [row[0] for row in rows]
@@ -0,0 +1,246 @@
+"""
+Perencana perjalanan antar halte (multi-rute, dengan transit).
+
+Graf transit disimpan di memori per proses: setiap rute aktif menjadi satu
+pola (urutan stop_id beserta waktu & jarak kumulatif), ditambah index
+stop_id -> (rute, posisi). Pencarian memakai algoritma ala RAPTOR: putaran
+ke-k menghitung waktu tiba tercepat dengan k kali naik kendaraan, sehingga
+hasilnya sekaligus berupa pilihan Pareto (lebih cepat vs lebih sedikit transit).
+
+Data rute tidak memiliki jadwal keberangkatan, jadi "waktu tiba" dihitung
+sebagai menit sejak berangkat: jumlah time_to_next sepanjang perjalanan
+ditambah JOURNEY_TRANSFER_MINUTES setiap kali pindah rute. Transit hanya
+terjadi di stop_id yang sama (tidak ada jalan kaki antar halte).
+
+Rute yang berubah ditandai dirty (lihat listener di app.py) dan hanya rute
+itu yang dimuat ulang pada query berikutnya. Perubahan dari worker lain
+terlihat setelah JOURNEY_GRAPH_TTL detik, saat graf dibangun ulang penuh.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import selectinload
+
+from models import Route
+
+# Waktu tunggu/pindah kendaraan setiap transit (menit)
+JOURNEY_TRANSFER_MINUTES = float(os.environ.get('JOURNEY_TRANSFER_MINUTES', 5))
+# Batas jumlah transit yang dicari
+JOURNEY_MAX_TRANSFERS = int(os.environ.get('JOURNEY_MAX_TRANSFERS', 3))
+# Kecepatan rata-rata untuk segmen tanpa time_to_next (km/jam)
+JOURNEY_AVG_SPEED_KMH = float(os.environ.get('JOURNEY_AVG_SPEED_KMH', 20))
+# Waktu segmen jika time_to_next dan distance_to_next sama-sama kosong (menit)
+JOURNEY_DEFAULT_SEGMENT_MINUTES = float(os.environ.get('JOURNEY_DEFAULT_SEGMENT_MINUTES', 2))
+# Interval bangun ulang penuh agar perubahan dari worker lain ikut terbaca (detik)
+JOURNEY_GRAPH_TTL = float(os.environ.get('JOURNEY_GRAPH_TTL', 60))
+# Cache hasil per (asal, tujuan, maks transit); dikosongkan setiap graf berubah
+JOURNEY_CACHE_MAX_ENTRIES = int(os.environ.get('JOURNEY_CACHE_MAX_ENTRIES', 1024))
+
+INF = float('inf')
+
+
+def _segment_minutes(route_stop):
+    if route_stop.time_to_next is not None:
+        return float(route_stop.time_to_next)
+    if route_stop.distance_to_next:
+        return route_stop.distance_to_next / JOURNEY_AVG_SPEED_KMH * 60
+    return JOURNEY_DEFAULT_SEGMENT_MINUTES
+
+
+class RoutePattern:
+    """Urutan halte satu rute dengan waktu (menit) dan jarak (km) kumulatif."""
+    __slots__ = ('route_id', 'name', 'stop_ids', 'stop_names', 'times', 'distances')
+
+    def __init__(self, route):
+        self.route_id = route.id
+        self.name = route.name
+        self.stop_ids = []
+        self.stop_names = []
+        self.times = []
+        self.distances = []
+        elapsed = distance = 0.0
+        for rs in route.route_stops:
+            self.stop_ids.append(rs.stop_id)
+            self.stop_names.append(rs.stop_name)
+            self.times.append(elapsed)
+            self.distances.append(distance)
+            elapsed += _segment_minutes(rs)
+            distance += rs.distance_to_next or 0.0
+
+
+class TransitGraph:
+    def __init__(self):
+        self._patterns = {}      # route_id -> RoutePattern
+        self._stop_routes = {}   # stop_id -> [(route_id, index), ...]
+        self._stop_names = {}    # stop_id -> nama halte
+        self._dirty = set()
+        self._results = OrderedDict()
+        self._built_at = None
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self.partial_rebuilds = 0
+
+    def mark_dirty(self, route_ids):
+        with self._lock:
+            self._dirty.update(route_ids)
+
+    # --- Pembaruan graf ---
+    def refresh(self):
+        """Bangun graf jika belum ada/kedaluwarsa, atau muat ulang rute yang dirty."""
+        with self._lock:
+            full = self._built_at is None or time.monotonic() - self._built_at > JOURNEY_GRAPH_TTL
+            dirty, self._dirty = self._dirty, set()
+        if full:
+            routes = Route.query.filter_by(is_active=True).options(selectinload(Route.route_stops)).all()
+            patterns = {route.id: RoutePattern(route) for route in routes}
+            with self._lock:
+                self._patterns = patterns
+                self._reindex()
+                self._results.clear()
+                self._built_at = time.monotonic()
+                self.rebuilds += 1
+        elif dirty:
+            routes = Route.query.filter(Route.id.in_(dirty)).options(selectinload(Route.route_stops)).all()
+            loaded = {route.id: route for route in routes}
+            with self._lock:
+                for route_id in dirty:
+                    self._patterns.pop(route_id, None)
+                    route = loaded.get(route_id)
+                    if route is not None and route.is_active:
+                        self._patterns[route_id] = RoutePattern(route)
+                self._reindex()
+                self._results.clear()
+                self.partial_rebuilds += 1
+
+    def _reindex(self):
+        stop_routes = {}
+        stop_names = {}
+        for pattern in self._patterns.values():
+            for index, stop_id in enumerate(pattern.stop_ids):
+                stop_routes.setdefault(stop_id, []).append((pattern.route_id, index))
+                stop_names.setdefault(stop_id, pattern.stop_names[index])
+        self._stop_routes = stop_routes
+        self._stop_names = stop_names
+
+    def has_stop(self, stop_id):
+        return stop_id in self._stop_routes
+
+    def stats(self):
+        with self._lock:
+            return {
+                'routes': len(self._patterns),
+                'stops': len(self._stop_routes),
+                'dirtyRoutes': len(self._dirty),
+                'cachedResults': len(self._results),
+                'rebuilds': self.rebuilds,
+                'partialRebuilds': self.partial_rebuilds,
+            }
+
+    # --- Pencarian ---
+    def plan(self, origin, target, max_transfers=JOURNEY_MAX_TRANSFERS):
+        """
+        Daftar perjalanan Pareto-optimal dari origin ke target, terurut dari
+        transit paling sedikit. Perjalanan dengan transit lebih banyak hanya
+        disertakan jika lebih cepat.
+        """
+        key = (origin, target, max_transfers)
+        with self._lock:
+            journeys = self._results.get(key)
+            if journeys is None:
+                journeys = self._raptor(origin, target, max_transfers)
+                self._results[key] = journeys
+                while len(self._results) > JOURNEY_CACHE_MAX_ENTRIES:
+                    self._results.popitem(last=False)
+            else:
+                self._results.move_to_end(key)
+            return journeys
+
+    def _raptor(self, origin, target, max_transfers):
+        patterns = self._patterns
+        stop_routes = self._stop_routes
+        best = {origin: 0.0}            # waktu tiba terbaik di semua putaran
+        labels = [{origin: 0.0}]        # labels[k][stop]: tiba dengan k kali naik
+        parents = [{}]                  # parents[k][stop]: (route_id, naik, turun)
+        marked = {origin}
+
+        for k in range(1, max_transfers + 2):
+            previous = labels[k - 1]
+            current = {}
+            parent = {}
+            penalty = JOURNEY_TRANSFER_MINUTES if k > 1 else 0.0
+
+            # Rute yang melewati halte yang baru membaik, dari posisi naik paling awal
+            queue = {}
+            for stop_id in marked:
+                for route_id, index in stop_routes.get(stop_id, ()):
+                    if index < queue.get(route_id, INF):
+                        queue[route_id] = index
+
+            marked = set()
+            for route_id, start in queue.items():
+                pattern = patterns[route_id]
+                stop_ids, times = pattern.stop_ids, pattern.times
+                # Waktu "berangkat dari awal rute" untuk kendaraan yang sedang dinaiki
+                boarded_offset = INF
+                board_index = None
+                for index in range(start, len(stop_ids)):
+                    stop_id = stop_ids[index]
+                    if board_index is not None:
+                        arrival = boarded_offset + times[index]
+                        # Pangkas: tidak lebih cepat dari yang sudah diketahui / dari tiba di tujuan
+                        if arrival < best.get(stop_id, INF) and arrival < best.get(target, INF):
+                            current[stop_id] = arrival
+                            best[stop_id] = arrival
+                            parent[stop_id] = (route_id, board_index, index)
+                            marked.add(stop_id)
+                    ready = previous.get(stop_id)
+                    if ready is not None:
+                        offset = ready + penalty - times[index]
+                        if offset < boarded_offset:
+                            boarded_offset = offset
+                            board_index = index
+
+            labels.append(current)
+            parents.append(parent)
+            if not marked:
+                break
+
+        journeys = []
+        for k in range(1, len(labels)):
+            if target in labels[k]:
+                journeys.append(self._reconstruct(parents, k, target, labels[k][target]))
+        return journeys
+
+    def _reconstruct(self, parents, rounds, target, arrival):
+        legs = []
+        stop_id = target
+        for k in range(rounds, 0, -1):
+            route_id, board, alight = parents[k][stop_id]
+            pattern = self._patterns[route_id]
+            legs.append({
+                'routeId': route_id,
+                'routeName': pattern.name,
+                'fromStopId': pattern.stop_ids[board],
+                'fromStopName': pattern.stop_names[board],
+                'toStopId': pattern.stop_ids[alight],
+                'toStopName': pattern.stop_names[alight],
+                'stops': alight - board,
+                'time': round(pattern.times[alight] - pattern.times[board], 2),
+                'distance': round(pattern.distances[alight] - pattern.distances[board], 3),
+            })
+            stop_id = pattern.stop_ids[board]
+        legs.reverse()
+        return {
+            'totalTime': round(arrival, 2),
+            'totalDistance': round(sum(leg['distance'] for leg in legs), 3),
+            'transfers': len(legs) - 1,
+            'legs': legs,
+        }
+
+    def stop_name(self, stop_id):
+        return self._stop_names.get(stop_id)
+
+
+journey_graph = TransitGraph()
@@ -24,7 +24,15 @@ class Route(db.Model):
     # Status Aktif/Tidak Aktif
     is_active = db.Column(db.Boolean, default=True)
     
-    # Relasi dengan RouteStop (one-to-many)
+    # Agregat halte, disimpan agar tidak dihitung ulang di setiap request.
+    # Diperbarui oleh refresh_aggregates() di transaksi yang sama dengan
+    # perubahan daftar halte.
+    stop_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_distance = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    total_time = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Relasi dengan RouteStop (one-to-many). Endpoint yang menampilkan halte
+    # memuatnya dengan selectinload agar tidak ada query per rute (N+1).
     route_stops = db.relationship('RouteStop', backref='route', lazy=True, cascade='all, delete-orphan', order_by='RouteStop.sequence_order')
     
     def to_dict(self, include_stops=False):
@@ -35,16 +43,36 @@ class Route(db.Model):
             'description': self.description,
             'origin': self.origin,
             'destination': self.destination,
-            'isActive': self.is_active
+            'isActive': self.is_active,
+            'totalStops': self.stop_count,
+            'totalDistance': self.total_distance,
+            'totalTime': self.total_time
         }
         
         if include_stops:
             result['stops'] = [rs.to_dict() for rs in self.route_stops]
-            result['totalStops'] = len(self.route_stops)
-            result['totalDistance'] = sum(rs.distance_to_next for rs in self.route_stops if rs.distance_to_next)
         
         return result
 
+    def refresh_aggregates(self):
+        """
+        Hitung ulang agregat rute dan jarak/waktu kumulatif setiap halte.
+        Dipanggil sebelum commit setiap kali daftar halte rute berubah;
+        perubahan yang belum di-flush ikut terbaca karena autoflush.
+        """
+        stops = RouteStop.query.filter_by(route_id=self.id).order_by(RouteStop.sequence_order).all()
+        distance = 0
+        elapsed = 0
+        for rs in stops:
+            rs.cumulative_distance = distance
+            rs.cumulative_time = elapsed
+            distance += rs.distance_to_next or 0
+            elapsed += rs.time_to_next or 0
+        self.stop_count = len(stops)
+        self.total_distance = distance
+        self.total_time = elapsed
+        return stops
+
 
 class RouteStop(db.Model):
     """Model untuk menyimpan urutan halte pada setiap rute beserta jarak antar halte."""
@@ -71,6 +99,11 @@ class RouteStop(db.Model):
     # Estimasi waktu tempuh ke halte berikutnya dalam menit (opsional)
     time_to_next = db.Column(db.Integer, nullable=True)
     
+    # Jarak (km) dan waktu (menit) dari halte pertama rute sampai halte ini.
+    # Selisih dua halte = jarak/waktu tempuh di antaranya, tanpa menjumlah ulang.
+    cumulative_distance = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    cumulative_time = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
     # Unique constraint: satu rute tidak boleh punya stop_id yang sama di sequence yang sama
     __table_args__ = (
         db.UniqueConstraint('route_id', 'sequence_order', name='unique_route_sequence'),
@@ -84,5 +117,7 @@ class RouteStop(db.Model):
             'stopName': self.stop_name,
             'sequenceOrder': self.sequence_order,
             'distanceToNext': self.distance_to_next,
-            'timeToNext': self.time_to_next
+            'timeToNext': self.time_to_next,
+            'cumulativeDistance': self.cumulative_distance,
+            'cumulativeTime': self.cumulative_time
         }
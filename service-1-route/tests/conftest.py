@@ -0,0 +1,8 @@
+import os
+import sys
+
+# app.py membaca konfigurasi saat di-import
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET", "test-secret-key-for-route-tests!")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
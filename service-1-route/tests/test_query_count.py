@@ -0,0 +1,76 @@
+import time
+from contextlib import contextmanager
+
+import jwt
+import pytest
+from sqlalchemy import event
+
+import app as route_service
+from auth import JWT_SECRET
+from models import db, Route, RouteStop
+
+
+@pytest.fixture
+def client():
+    with route_service.app.app_context():
+        db.create_all()
+        yield route_service.app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+
+def _seed(route_count, stops_per_route=3):
+    for index in range(route_count):
+        route = Route(name=f'Rute {index}', origin='A', destination='B')
+        route.route_stops = [
+            RouteStop(stop_id=stop, stop_name=f'Halte {stop}', sequence_order=stop,
+                      distance_to_next=1.0, time_to_next=2)
+            for stop in range(1, stops_per_route + 1)
+        ]
+        route.refresh_aggregates()
+        db.session.add(route)
+    db.session.commit()
+    # Query setelah ini harus ke database, bukan dari identity map session
+    db.session.expunge_all()
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _admin_headers():
+    token = jwt.encode({'sub': 'admin', 'role': 'admin', 'exp': int(time.time()) + 600},
+                       JWT_SECRET, algorithm='HS256')
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.mark.parametrize('route_count', [1, 5, 30])
+def test_admin_routes_uses_two_queries(client, route_count):
+    _seed(route_count)
+    with count_queries() as statements:
+        response = client.get('/admin/routes', headers=_admin_headers())
+
+    assert response.status_code == 200
+    assert response.json['total'] == route_count
+    assert len(statements) == 2
+
+
+@pytest.mark.parametrize('route_count', [1, 5, 30])
+@pytest.mark.parametrize('path', ['/routes/1', '/routes/1/stops'])
+def test_route_detail_uses_two_queries(client, route_count, path):
+    _seed(route_count)
+    with count_queries() as statements:
+        response = client.get(path)
+
+    assert response.status_code == 200
+    assert len(statements) == 2
@@ -0,0 +1,64 @@
+import pytest
+
+from models import db, Route, RouteStop
+from test_query_count import client, _seed, _admin_headers  # noqa: F401
+
+
+def _stops(route_id=1):
+    return [
+        (rs.stop_id, rs.stop_name, rs.sequence_order, rs.cumulative_distance)
+        for rs in RouteStop.query.filter_by(route_id=route_id).order_by(RouteStop.sequence_order)
+    ]
+
+
+def _put(client, stops, route_id=1):
+    return client.put(f'/admin/routes/{route_id}/stops', json={'stops': stops}, headers=_admin_headers())
+
+
+def _entry(stop_id, **extra):
+    return {'stopId': stop_id, 'stopName': f'Halte {stop_id}', 'distanceToNext': 1.0, 'timeToNext': 2, **extra}
+
+
+def test_reorder_stops(client):
+    _seed(1)
+
+    response = _put(client, [_entry(3), _entry(1), _entry(2)])
+
+    assert response.status_code == 200
+    assert [stop[0] for stop in _stops()] == [3, 1, 2]
+    assert [stop[3] for stop in _stops()] == [0, 1.0, 2.0]
+
+
+def test_insert_and_delete_stops(client):
+    _seed(1)
+
+    response = _put(client, [_entry(1), _entry(9), _entry(3)])
+
+    assert response.status_code == 200
+    assert response.get_json()['changes']['removed'] == 1
+    assert response.get_json()['changes']['added'] == 1
+    assert [stop[0] for stop in _stops()] == [1, 9, 3]
+    route = db.session.get(Route, 1)
+    assert route.stop_count == 3
+
+
+@pytest.mark.parametrize('stops, position', [
+    ([_entry(1), _entry(2, distanceToNext='1')], 2),
+    ([_entry(1, routeStopId=[1]), _entry(2)], 1),
+    ([_entry(1, routeStopId=1), _entry(2, routeStopId=1)], 2),
+    ([_entry(1), _entry(2, timeToNext=-3)], 2),
+    ([_entry(1), {'stopId': 2, 'stopName': 7}], 2),
+    ([_entry(1), _entry('2')], 2),
+    ([_entry(1), _entry(True)], 2),
+    ([_entry(1), 'halte'], 2),
+])
+def test_bad_input_is_rejected_without_changes(client, stops, position):
+    _seed(1)
+    before = _stops()
+
+    response = _put(client, stops)
+
+    assert response.status_code == 400
+    assert f'halte ke-{position}' in response.get_json()['error'].lower()
+    db.session.expire_all()
+    assert _stops() == before
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import text
+
+import app as route_service
+from models import db, Route
+
+
+@pytest.fixture
+def client():
+    with route_service.app.app_context():
+        db.create_all()
+        route_service.route_search_index.create(db.session)
+        yield route_service.app.test_client()
+        db.session.remove()
+        db.session.execute(text(f'DROP TABLE IF EXISTS {route_service.route_search_index.fts_table}'))
+        db.session.commit()
+        route_service.route_search_index._available = False
+        db.drop_all()
+
+
+def _add_route(name, description=None, is_active=True):
+    db.session.add(Route(name=name, description=description, origin='A', destination='B',
+                         is_active=is_active))
+
+
+def test_inactive_matches_do_not_hide_active_routes(client):
+    for index in range(250):
+        _add_route(f'Zeta {index}', is_active=False)
+    _add_route('Zeta active')
+    db.session.commit()
+
+    response = client.get('/routes/search?query=zeta')
+
+    assert response.status_code == 200
+    assert [route['name'] for route in response.json['routes']] == ['Zeta active']
+
+
+def test_name_matches_rank_above_description_matches(client):
+    for index in range(300):
+        _add_route(f'Rute {index}', description='melewati dago')
+    _add_route('Dago - Leuwipanjang')
+    db.session.commit()
+
+    response = client.get('/routes/search?query=dago')
+
+    assert response.json['routes'][0]['name'] == 'Dago - Leuwipanjang'
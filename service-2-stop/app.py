@@ -3,11 +3,13 @@ from flask import Flask, jsonify, request, render_template
 from flask_sqlalchemy import SQLAlchemy
 from dotenv import load_dotenv
 from sqlalchemy import or_
-from functools import wraps
-import requests
 
 # Menggunakan relative import untuk models (memastikan models.py ada di folder yang sama)
 from models import db, Stop 
+from deadline import init_app as init_deadline
+# Verifikasi token admin lokal (tanpa memanggil service-user tiap request)
+from auth import admin_required
+from fts import FullTextIndex
 
 # Muat variabel lingkungan
 load_dotenv()
@@ -23,35 +25,17 @@ db_path = os.path.join(app.instance_path, 'stop.db')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', f'sqlite:///{db_path}')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Jumlah maksimal hasil pencarian /stops/search
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 50))
+
 # Inisialisasi Database
 db.init_app(app)
 
-# --- Middleware untuk Autentikasi Admin ---
-def admin_required(f):
-    """Decorator untuk memvalidasi admin credentials."""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        # Dapatkan token dari header
-        token = request.headers.get('Authorization')
-        
-        if not token:
-            return jsonify({'error': 'Token tidak ditemukan'}), 401
-
-        try:
-            # Verifikasi token admin ke service-user
-            response = requests.get(
-                'http://service-user:5001/verify-admin',
-                headers={'Authorization': token}
-            )
-            
-            if response.status_code != 200:
-                return jsonify({'error': 'Unauthorized - Admin role required'}), 403
-                
-        except requests.exceptions.RequestException:
-            return jsonify({'error': 'Gagal terhubung ke service autentikasi'}), 500
-            
-        return f(*args, **kwargs)
-    return decorated_function
+# Index full-text nama halte (SQLite FTS5)
+stop_search_index = FullTextIndex(Stop.__tablename__, ['name'])
+
+# Hentikan pekerjaan untuk request yang deadline-nya (dari gateway) sudah lewat
+init_deadline(app)
 
 # --- Definisi Data Seeding Dua Arah (Total 20 Halte) ---
 
@@ -154,10 +138,16 @@ def search_stops():
     if not query_name:
         return jsonify({'error': 'Parameter query wajib diisi.'}), 400
         
-    # Mencari halte yang namanya mengandung query_name (case-insensitive)
-    stops = Stop.query.filter(
-        Stop.name.ilike(f'%{query_name}%')
-    ).all()
+    # Index FTS: prefix per kata, tanpa beda aksen, terurut relevansi
+    ids = stop_search_index.search_ids(db.session, query_name, SEARCH_MAX_RESULTS)
+    if ids is not None:
+        by_id = {stop.id: stop for stop in Stop.query.filter(Stop.id.in_(ids))}
+        stops = [by_id[stop_id] for stop_id in ids if stop_id in by_id]
+    else:
+        # Fallback untuk database tanpa FTS5: nama mengandung query_name (case-insensitive)
+        stops = Stop.query.filter(
+            Stop.name.ilike(f'%{query_name}%')
+        ).limit(SEARCH_MAX_RESULTS).all()
     
     return jsonify([stop.to_dict() for stop in stops]), 200
 
@@ -327,8 +317,18 @@ def init_db_command():
     with app.app_context():
         # Membuat semua tabel berdasarkan models.py
         db.create_all()
+        stop_search_index.create(db.session)
         print('Database Halte telah diinisialisasi.')
 
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Bangun ulang index full-text halte dari tabel stop."""
+    with app.app_context():
+        if stop_search_index.rebuild(db.session):
+            print('Index pencarian halte telah dibangun ulang.')
+        else:
+            print('FTS5 tidak tersedia; pencarian memakai ilike.')
+
 @app.cli.command('seed-stops')
 def seed_stops_command():
     """Menambahkan data halte (stops) awal untuk Rute 3 (20 Halte Dua Arah)."""
@@ -370,5 +370,6 @@ if __name__ == '__main__':
     # Pastikan app_context digunakan saat run lokal untuk membuat DB
     with app.app_context():
         db.create_all() 
+        stop_search_index.create(db.session)
     # Port 5003 agar sesuai dengan docker-compose
     app.run(debug=True, host='0.0.0.0', port=5003)
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+Verifikasi token admin secara lokal.
+
+Token JWT dari service-user diverifikasi dengan JWT_SECRET yang sama, lalu
+klaim role diperiksa di sini, tanpa memanggil service-user di setiap request
+admin. Payload hasil decode disimpan di cache sampai token kedaluwarsa.
+
+Jika AUTH_REMOTE_CHECK aktif, token tetap dicek ke service-user
+(/verify-admin) agar user yang sudah dihapus atau diturunkan role-nya
+langsung ditolak. Hasil pengecekan itu di-cache selama AUTH_REMOTE_CHECK_TTL
+detik.
+
+File ini identik di setiap service (build context Docker terpisah per service).
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import jwt
+import requests
+from flask import jsonify, request
+
+from deadline import outbound_get
+
+JWT_SECRET = os.environ.get('JWT_SECRET', 'default-secret-key')
+JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
+
+AUTH_SERVICE_URL = os.environ.get('AUTH_SERVICE_URL', 'http://service-user:5001')
+AUTH_REMOTE_CHECK = os.environ.get('AUTH_REMOTE_CHECK', 'False').lower() in ('1', 'true', 'yes')
+AUTH_REMOTE_CHECK_TTL = float(os.environ.get('AUTH_REMOTE_CHECK_TTL', 30))
+
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', 10000))
+# Batas umur entry untuk token tanpa klaim exp
+AUTH_CACHE_MAX_TTL = int(os.environ.get('AUTH_CACHE_MAX_TTL', 300))
+
+
+class TokenCache:
+    """Cache LRU berbatas waktu: token -> (nilai, waktu kedaluwarsa)."""
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return value
+
+    def set(self, token, value, expires_at):
+        with self._lock:
+            self._entries[token] = (value, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_payload_cache = TokenCache(AUTH_CACHE_MAX_ENTRIES)
+_remote_cache = TokenCache(AUTH_CACHE_MAX_ENTRIES)
+
+
+def decode_token(token):
+    """Decode dan verifikasi JWT; hasilnya di-cache sampai klaim exp."""
+    payload = _payload_cache.get(token)
+    if payload is None:
+        # Raise jwt.InvalidTokenError (termasuk ExpiredSignatureError) jika tidak valid
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        expires_at = min(payload.get('exp', float('inf')), time.time() + AUTH_CACHE_MAX_TTL)
+        _payload_cache.set(token, payload, expires_at)
+    return payload
+
+
+def remote_admin_check(auth_header, token):
+    """True jika service-user masih mengakui token sebagai admin."""
+    verdict = _remote_cache.get(token)
+    if verdict is None:
+        response = outbound_get(f'{AUTH_SERVICE_URL}/verify-admin',
+                                headers={'Authorization': auth_header})
+        verdict = response.status_code == 200
+        _remote_cache.set(token, verdict, time.time() + AUTH_REMOTE_CHECK_TTL)
+    return verdict
+
+
+def admin_required(f):
+    """Decorator endpoint admin: token valid dengan role 'admin'."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            return jsonify({'error': 'Token tidak ditemukan'}), 401
+
+        parts = auth_header.split()
+        token = parts[1] if len(parts) == 2 and parts[0].lower() == 'bearer' else auth_header
+        try:
+            payload = decode_token(token)
+        except jwt.InvalidTokenError:
+            return jsonify({'error': 'Unauthorized - Admin role required'}), 403
+        if payload.get('role') != 'admin':
+            return jsonify({'error': 'Unauthorized - Admin role required'}), 403
+
+        if AUTH_REMOTE_CHECK:
+            try:
+                if not remote_admin_check(auth_header, token):
+                    return jsonify({'error': 'Unauthorized - Admin role required'}), 403
+            except requests.exceptions.RequestException:
+                return jsonify({'error': 'Gagal terhubung ke service autentikasi'}), 500
+
+        return f(*args, **kwargs)
+    return decorated_function
@@ -3,8 +3,10 @@ from flask import Flask, jsonify, request, render_template
 from flask_sqlalchemy import SQLAlchemy
 from dotenv import load_dotenv
 import requests
-from functools import wraps
 from models import db, Bus
+from deadline import outbound_get, init_app as init_deadline
+# Verifikasi token admin lokal (tanpa memanggil service-user tiap request)
+from auth import admin_required
 
 load_dotenv()
 
@@ -23,31 +25,8 @@ ROUTE_SERVICE_URL = os.environ.get('ROUTE_SERVICE_URL', 'http://localhost:5002')
 
 db.init_app(app)
 
-# --- Middleware untuk Verifikasi Token JWT ---
-def admin_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        # Dapatkan token dari header
-        token = request.headers.get('Authorization')
-        
-        if not token:
-            return jsonify({'error': 'Token tidak ditemukan'}), 401
-
-        try:
-            # Verifikasi token admin ke service-user
-            response = requests.get(
-                'http://service-user:5001/verify-admin',
-                headers={'Authorization': token}
-            )
-            
-            if response.status_code != 200:
-                return jsonify({'error': 'Unauthorized - Admin role required'}), 403
-                
-        except requests.exceptions.RequestException:
-            return jsonify({'error': 'Gagal terhubung ke service autentikasi'}), 500
-            
-        return f(*args, **kwargs)
-    return decorated_function
+# Hentikan pekerjaan untuk request yang deadline-nya (dari gateway) sudah lewat
+init_deadline(app)
 
 # WEB UI ENDPOINT
 @app.route('/')
@@ -145,7 +124,7 @@ def assign_bus_to_route(busId):
     
     # Validasi route_id dengan Route Service
     try:
-        route_response = requests.get(f'{ROUTE_SERVICE_URL}/routes/{data["route_id"]}')
+        route_response = outbound_get(f'{ROUTE_SERVICE_URL}/routes/{data["route_id"]}')
         if route_response.status_code != 200:
             return jsonify({'error': 'Route tidak ditemukan di Route Service.'}), 404
         
@@ -2,13 +2,15 @@ import os
 from flask import Flask, jsonify, request, render_template
 from flask_sqlalchemy import SQLAlchemy
 from dotenv import load_dotenv
-from functools import wraps
 from datetime import datetime, timedelta
 from math import radians, cos, sin, asin, sqrt
 import requests
 
 # Import models
 from models import db, Schedule, BusArrival
+from deadline import outbound_get, init_app as init_deadline
+# Verifikasi token admin lokal (tanpa memanggil service-user tiap request)
+from auth import admin_required
 
 # Muat variabel lingkungan
 load_dotenv()
@@ -31,31 +33,8 @@ BUS_SERVICE_URL = os.environ.get('BUS_SERVICE_URL', 'http://localhost:5004')
 # Inisialisasi Database
 db.init_app(app)
 
-
-# --- Middleware untuk Autentikasi Admin ---
-def admin_required(f):
-    """Decorator untuk memvalidasi admin credentials."""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        
-        if not token:
-            return jsonify({'error': 'Token tidak ditemukan'}), 401
-
-        try:
-            response = requests.get(
-                'http://service-user:5001/verify-admin',
-                headers={'Authorization': token}
-            )
-            
-            if response.status_code != 200:
-                return jsonify({'error': 'Unauthorized - Admin role required'}), 403
-                
-        except requests.exceptions.RequestException:
-            return jsonify({'error': 'Gagal terhubung ke service autentikasi'}), 500
-            
-        return f(*args, **kwargs)
-    return decorated_function
+# Hentikan pekerjaan untuk request yang deadline-nya (dari gateway) sudah lewat
+init_deadline(app)
 
 
 # --- Helper Functions ---
@@ -96,7 +75,7 @@ def get_bus_location(bus_id):
     Mengambil lokasi real-time bus dari Bus Service.
     """
     try:
-        response = requests.get(f'{BUS_SERVICE_URL}/buses/{bus_id}', timeout=5)
+        response = outbound_get(f'{BUS_SERVICE_URL}/buses/{bus_id}')
         if response.status_code == 200:
             return response.json()
         return None
@@ -109,7 +88,7 @@ def get_stop_location(stop_id):
     Mengambil lokasi halte dari Stop Service.
     """
     try:
-        response = requests.get(f'{STOP_SERVICE_URL}/stops/{stop_id}', timeout=5)
+        response = outbound_get(f'{STOP_SERVICE_URL}/stops/{stop_id}')
         if response.status_code == 200:
             return response.json()
         return None
@@ -122,7 +101,7 @@ def get_route_info(route_id):
     Mengambil informasi rute dari Route Service.
     """
     try:
-        response = requests.get(f'{ROUTE_SERVICE_URL}/routes/{route_id}', timeout=5)
+        response = outbound_get(f'{ROUTE_SERVICE_URL}/routes/{route_id}')
         if response.status_code == 200:
             return response.json()
         return None
@@ -271,7 +250,7 @@ def get_stop_arrivals(stopId):
     
     # Ambil semua bus yang sedang beroperasi
     try:
-        buses_response = requests.get(f'{BUS_SERVICE_URL}/buses', timeout=5)
+        buses_response = outbound_get(f'{BUS_SERVICE_URL}/buses')
         if buses_response.status_code != 200:
             return jsonify({'error': 'Tidak dapat mengambil data bus.'}), 500
         
@@ -1,12 +1,28 @@
 import os
+import io
+import csv
+import time
+import uuid
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import click
 from flask import Flask, jsonify, request, g, render_template
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import object_session
 from flask_migrate import Migrate
 from dotenv import load_dotenv
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash
 import jwt
 from functools import wraps
+from deadline import init_app as init_deadline, time_left
+from passwords import hash_password, hash_password_waves, verify_password, PasswordPoolBusy, PASSWORD_HASH_METHOD
+import passwords
 
 # Muat variabel lingkungan dari file .env
 load_dotenv()
@@ -26,16 +42,35 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 JWT_SECRET = os.environ.get("JWT_SECRET", "default-secret-key")
 JWT_ALGORITHM = os.environ.get("JWT_ALGORITHM", "HS256")
 TOKEN_TTL_MINUTES = int(os.environ.get("TOKEN_TTL_MINUTES", 30))
+REFRESH_TOKEN_TTL_DAYS = int(os.environ.get("REFRESH_TOKEN_TTL_DAYS", 30))
+
+# Import user massal (/admin/users/bulk)
+BULK_IMPORT_MAX_ROWS = int(os.environ.get("BULK_IMPORT_MAX_ROWS", 5000))
+BULK_IMPORT_BATCH_SIZE = int(os.environ.get("BULK_IMPORT_BATCH_SIZE", 500))
+# Waktu (detik) yang disisakan sebelum deadline gateway untuk insert dan respons;
+# baris yang belum sempat di-hash dilaporkan "skipped" agar bisa dikirim ulang
+BULK_IMPORT_DEADLINE_RESERVE = float(os.environ.get("BULK_IMPORT_DEADLINE_RESERVE", 1.0))
+
+# Pagination /admin/users
+USERS_PAGE_SIZE = int(os.environ.get("USERS_PAGE_SIZE", 50))
+USERS_PAGE_MAX = int(os.environ.get("USERS_PAGE_MAX", 200))
 
 app.config['JWT_SECRET'] = JWT_SECRET
 app.config['JWT_ALGORITHM'] = JWT_ALGORITHM
 app.config['SECRET_KEY'] = os.environ.get("FLASK_SECRET_KEY", "flask-fallback-key")
 
+# Konfigurasi cache user untuk token_required
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 60))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get("USER_CACHE_MAX_ENTRIES", 10000))
+
 
 # === Inisialisasi Database ===
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
 
+# Hentikan pekerjaan untuk request yang deadline-nya (dari gateway) sudah lewat
+init_deadline(app)
+
 
 # === Model Database ===
 class User(db.Model):
@@ -43,11 +78,161 @@ class User(db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(256), nullable=False) # Menyimpan hash, bukan password asli
     role = db.Column(db.String(80), nullable=False, default='user')
+    # Filter role + urutan id di /admin/users memakai index (role, id);
+    # prefix username memakai index unik username.
+    __table_args__ = (db.Index('ix_user_role_id', 'role', 'id'),)
+
+    # Refresh token ikut terhapus saat user dihapus (SQLite tidak menegakkan FK)
+    refresh_tokens = db.relationship('RefreshToken', backref='user', cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<User {self.username}>'
 
 
+class RefreshToken(db.Model):
+    """
+    Refresh token berumur panjang. Yang disimpan hanya hash SHA-256 dari
+    token (diindeks), bukan token aslinya. Setiap /refresh menghasilkan token
+    baru dalam family yang sama dan mencabut token lama (rotasi).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    family_id = db.Column(db.String(32), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    revoked = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# === Cache User ===
+class UserRecord:
+    """Salinan data user (id, username, role) yang aman disimpan di luar session DB."""
+    __slots__ = ('id', 'username', 'role')
+
+    def __init__(self, id, username, role):
+        self.id = id
+        self.username = username
+        self.role = role
+
+
+class UserCache:
+    """
+    Cache LRU berbatas waktu: username -> UserRecord. Dipakai token_required
+    agar /verify-admin tidak membaca SQLite di setiap request.
+    """
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, username):
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[username]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(username)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, record):
+        with self._lock:
+            self._entries[record.username] = (record, time.monotonic() + self.ttl)
+            self._entries.move_to_end(record.username)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username):
+        with self._lock:
+            if self._entries.pop(username, None) is not None:
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+user_cache = UserCache(USER_CACHE_TTL, USER_CACHE_MAX_ENTRIES)
+
+
+def load_user(username):
+    """Ambil user dari cache, atau dari database jika belum ada (None jika tidak ditemukan)."""
+    record = user_cache.get(username)
+    if record is None:
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            return None
+        record = UserRecord(user.id, user.username, user.role)
+        user_cache.set(record)
+    return record
+
+
+# Setiap insert/update/delete User (register, delete_user, perubahan role)
+# menghapus entry cache saat flush, lalu sekali lagi setelah commit agar
+# request lain yang sempat membaca data lama sebelum commit tidak menyimpannya.
+# Catatan: query.update()/query.delete() massal tidak memicu event ini.
+def _usernames_of(target):
+    history = db.inspect(target).attrs.username.history
+    return {target.username, *history.deleted}
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    session = object_session(target)
+    for username in _usernames_of(target):
+        user_cache.invalidate(username)
+        session.info.setdefault('dirty_usernames', set()).add(username)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_committed_users(session):
+    for username in session.info.pop('dirty_usernames', ()):
+        user_cache.invalidate(username)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_dirty_users(session):
+    session.info.pop('dirty_usernames', None)
+
+
+def _hash_refresh_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def issue_refresh_token(user_id, family_id=None):
+    """Membuat refresh token baru (disimpan hash-nya). Return token asli untuk client."""
+    token = secrets.token_urlsafe(32)
+    db.session.add(RefreshToken(
+        token_hash=_hash_refresh_token(token),
+        family_id=family_id or uuid.uuid4().hex,
+        user_id=user_id,
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_TTL_DAYS),
+    ))
+    return token
+
+
+def revoke_refresh_family(family_id):
+    """Cabut semua refresh token dalam satu family (logout atau token lama dipakai ulang)."""
+    tokens = RefreshToken.query.filter_by(family_id=family_id, revoked=False).all()
+    for token in tokens:
+        token.revoked = True
+
+
 # === Fungsi Helper ===
 def generate_token(username: str, role: str) -> str:
     """Membuat JWT token baru."""
@@ -56,6 +241,7 @@ def generate_token(username: str, role: str) -> str:
         "role": role,
         "exp": datetime.utcnow() + timedelta(minutes=TOKEN_TTL_MINUTES),
         "iat": datetime.utcnow(),
+        "jti": uuid.uuid4().hex,  # id unik token
     }
     return jwt.encode(payload, app.config['JWT_SECRET'], algorithm=app.config['JWT_ALGORITHM'])
 
@@ -89,11 +275,12 @@ def token_required(f):
             if not username:
                 return jsonify({'message': 'Token invalid!', 'reason': 'Missing subject (sub)'}), 401
                 
-            current_user = User.query.filter_by(username=username).first()
+            current_user = load_user(username)
             if not current_user:
                 return jsonify({"error": "User not found"}), 404
             
             g.current_user = current_user
+            g.token_payload = data
             
         except jwt.ExpiredSignatureError:
             return jsonify({"error": "Token expired"}), 401
@@ -116,6 +303,12 @@ def admin_required(f):
     return decorated_function
 
 
+@app.errorhandler(PasswordPoolBusy)
+def handle_password_pool_busy(error):
+    """Antrean hashing penuh: tolak cepat, jangan biarkan request menumpuk."""
+    return jsonify({"message": "Server sedang sibuk, coba lagi sebentar lagi"}), 503, {"Retry-After": "1"}
+
+
 # === Routes ===
 
 @app.route('/')
@@ -135,13 +328,17 @@ def login():
 
     user = User.query.filter_by(username=username).first()
 
-    if not user or not check_password_hash(user.password_hash, password):
+    if not user or not verify_password(user.password_hash, password):
         return jsonify({"message": "Kredensial tidak valid"}), 401
 
     token = generate_token(user.username, user.role)
+    refresh_token = issue_refresh_token(user.id)
+    db.session.commit()
     return jsonify({
         "token": token,
         "access_token": token, 
+        "refresh_token": refresh_token,
+        "expires_in": TOKEN_TTL_MINUTES * 60,
         "user": {
             "id": user.id,
             "username": user.username,
@@ -149,6 +346,68 @@ def login():
         }
     })
 
+@app.post("/refresh")
+def refresh():
+    """
+    Menukar refresh token dengan access token baru tanpa memeriksa password.
+    Refresh token lama dicabut dan diganti yang baru (rotasi). Jika token
+    yang sudah dicabut dipakai lagi, seluruh family-nya ikut dicabut.
+    """
+    refresh_token = (request.get_json(silent=True) or {}).get("refresh_token")
+    if not refresh_token:
+        return jsonify({"message": "refresh_token wajib diisi"}), 400
+
+    token_hash = _hash_refresh_token(refresh_token)
+    stored = RefreshToken.query.filter_by(token_hash=token_hash).first()
+    if not stored or stored.expires_at <= datetime.utcnow():
+        return jsonify({"message": "Refresh token tidak valid"}), 401
+    user = db.session.get(User, stored.user_id)
+    if not user:
+        return jsonify({"message": "Refresh token tidak valid"}), 401
+
+    # Token hasil rotasi hanya ditandai dicabut (tidak dihapus) supaya
+    # pemakaian ulang tetap terdeteksi dan family-nya bisa dicabut.
+    # Dicabut dengan satu UPDATE bersyarat: dari dua /refresh bersamaan dengan
+    # token yang sama hanya satu yang mengubah baris, yang lain dianggap reuse.
+    rotated = RefreshToken.query.filter_by(id=stored.id, revoked=False).update(
+        {"revoked": True}, synchronize_session=False)
+    if rotated == 0:
+        # Token lama dipakai ulang: kemungkinan bocor, cabut semua turunannya
+        revoke_refresh_family(stored.family_id)
+        db.session.commit()
+        return jsonify({"message": "Refresh token tidak valid"}), 401
+    new_refresh_token = issue_refresh_token(user.id, stored.family_id)
+    db.session.commit()
+
+    token = generate_token(user.username, user.role)
+    return jsonify({
+        "token": token,
+        "access_token": token,
+        "refresh_token": new_refresh_token,
+        "expires_in": TOKEN_TTL_MINUTES * 60,
+    })
+
+
+@app.post("/logout")
+@token_required
+def logout(current_user):
+    """
+    Mencabut family refresh token yang dikirim, sehingga sesi tidak bisa
+    diperpanjang lagi. Access token TIDAK dicabut: gateway dan service lain
+    memverifikasi JWT secara lokal tanpa daftar revokasi bersama, jadi access
+    token tetap berlaku sampai klaim exp (TOKEN_TTL_MINUTES). Client harus
+    membuang access token-nya sendiri; perpendek TOKEN_TTL_MINUTES jika
+    jendela ini terlalu panjang.
+    """
+    refresh_token = (request.get_json(silent=True) or {}).get("refresh_token")
+    if refresh_token:
+        stored = RefreshToken.query.filter_by(token_hash=_hash_refresh_token(refresh_token)).first()
+        if stored and stored.user_id == current_user.id:
+            revoke_refresh_family(stored.family_id)
+            db.session.commit()
+    return jsonify({"message": "Logout berhasil"}), 200
+
+
 @app.post("/register")
 def register():
     """Mendaftarkan pengguna baru."""
@@ -163,7 +422,7 @@ def register():
     if User.query.filter_by(username=username).first():
         return jsonify({"message": "Username sudah terdaftar"}), 409
 
-    password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+    password_hash = hash_password(password)
     new_user = User(username=username, password_hash=password_hash, role=role)
     db.session.add(new_user)
     db.session.commit()
@@ -180,17 +439,173 @@ def register():
 
 @app.get("/admin/users")
 @admin_required
-def get_users():
-    users = User.query.all()
+def get_users(current_user):
+    """
+    Daftar user dengan keyset pagination berdasarkan id.
+    Query: after_id (cursor dari nextCursor), limit (maks USERS_PAGE_MAX),
+    role, prefix (awalan username).
+    """
+    try:
+        after_id = int(request.args.get("after_id", 0))
+        limit = int(request.args.get("limit", USERS_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"message": "after_id dan limit harus berupa angka"}), 400
+    limit = max(1, min(limit, USERS_PAGE_MAX))
+
+    query = User.query.with_entities(User.id, User.username, User.role).filter(User.id > after_id)
+    role = request.args.get("role")
+    if role:
+        query = query.filter(User.role == role)
+    prefix = request.args.get("prefix")
+    if prefix:
+        # Range query (bukan LIKE) agar index username bisa dipakai:
+        # 'ab' -> username >= 'ab' AND username < 'ac'
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        query = query.filter(User.username >= prefix, User.username < upper)
+
+    # Ambil satu baris ekstra untuk tahu apakah masih ada halaman berikutnya
+    rows = query.order_by(User.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     return jsonify({
-        "users": [{
-            "id": user.id,
-            "username": user.username,
-            "role": user.role
-        } for user in users]
+        "users": [{"id": row.id, "username": row.username, "role": row.role} for row in rows],
+        "limit": limit,
+        "nextCursor": rows[-1].id if has_more else None,
     })
 
 
+def _read_bulk_rows():
+    """
+    Baris user dari body request: CSV (header username,password,role) dibaca
+    per baris dari stream, atau JSON berupa list / {"users": [...]}.
+    Raise ValueError jika format tidak dikenali atau baris terlalu banyak.
+    """
+    if request.mimetype in ('text/csv', 'application/csv'):
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        rows = csv.DictReader(stream)
+    elif request.is_json:
+        data = request.get_json(silent=True)
+        rows = data.get("users") if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError("Body JSON harus berupa list user atau {\"users\": [...]}")
+    else:
+        raise ValueError("Content-Type harus application/json atau text/csv")
+
+    result = []
+    for row in rows:
+        if len(result) >= BULK_IMPORT_MAX_ROWS:
+            raise ValueError(f"Maksimal {BULK_IMPORT_MAX_ROWS} user per import")
+        result.append(row if isinstance(row, dict) else {})
+    return result
+
+
+def _insert_users(rows):
+    """Insert satu batch dalam satu transaksi. Return daftar (row, error) yang gagal."""
+    try:
+        db.session.execute(insert(User), [
+            {"username": row["username"], "password_hash": row["password_hash"], "role": row["role"]}
+            for row in rows
+        ])
+        db.session.commit()
+        return []
+    except IntegrityError:
+        # Username dibuat request lain di tengah import: ulangi per baris agar tahu yang mana
+        db.session.rollback()
+        failed = []
+        for row in rows:
+            try:
+                db.session.execute(insert(User), [{"username": row["username"],
+                                                   "password_hash": row["password_hash"],
+                                                   "role": row["role"]}])
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                failed.append((row, "Username sudah terdaftar"))
+        return failed
+
+
+@app.post("/admin/users/bulk")
+@admin_required
+def bulk_import_users(current_user):
+    """
+    Mendaftarkan banyak user sekaligus. Password di-hash paralel di process
+    pool, cek username bentrok dengan satu query, lalu insert per batch.
+    Mengembalikan hasil per baris. Jika deadline dari gateway hampir habis,
+    baris yang belum di-hash tidak diproses dan dilaporkan "skipped".
+    """
+    try:
+        rows = _read_bulk_rows()
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({"message": str(e)}), 400
+
+    results = []
+    valid = []
+    seen = set()
+    for index, row in enumerate(rows, start=1):
+        username = row.get("username") or ""
+        password = row.get("password") or ""
+        role = row.get("role") or "user"
+        # JSON bisa berisi angka/list/objek; CSV selalu teks
+        if not all(isinstance(value, str) for value in (username, password, role)):
+            results.append({"row": index, "username": username if isinstance(username, str) else None,
+                            "status": "error", "error": "Username, password, dan role harus berupa teks"})
+            continue
+        username = username.strip()
+        role = role.strip()
+        result = {"row": index, "username": username}
+        results.append(result)
+        if not username or not password:
+            result.update(status="error", error="Username dan password wajib diisi")
+        elif username in seen:
+            result.update(status="error", error="Username duplikat di dalam import")
+        else:
+            seen.add(username)
+            valid.append({"username": username, "password": password, "role": role, "result": result})
+
+    # Satu query untuk semua username yang sudah ada
+    existing = set()
+    if valid:
+        existing = {name for (name,) in db.session.query(User.username)
+                    .filter(User.username.in_([row["username"] for row in valid]))}
+    pending = []
+    for row in valid:
+        if row["username"] in existing:
+            row["result"].update(status="error", error="Username sudah terdaftar")
+        else:
+            pending.append(row)
+
+    # Hash per gelombang; berhenti sebelum gelombang berikutnya jika sisa
+    # deadline tidak cukup, agar client tetap menerima laporan per baris
+    hashed = 0
+    started = time.monotonic()
+    for waves, hashes in enumerate(hash_password_waves([row["password"] for row in pending]), start=1):
+        for row, password_hash in zip(pending[hashed:], hashes):
+            row["password_hash"] = password_hash
+            row["result"]["status"] = "created"
+        hashed += len(hashes)
+        left = time_left()
+        wave_seconds = (time.monotonic() - started) / waves
+        if hashed < len(pending) and left is not None and left < wave_seconds + BULK_IMPORT_DEADLINE_RESERVE:
+            break
+    for row in pending[hashed:]:
+        row["result"].update(status="skipped",
+                             error="Batas waktu request habis sebelum baris ini diproses, kirim ulang")
+    pending = pending[:hashed]
+
+    for start in range(0, len(pending), BULK_IMPORT_BATCH_SIZE):
+        for row, error in _insert_users(pending[start:start + BULK_IMPORT_BATCH_SIZE]):
+            row["result"].update(status="error", error=error)
+
+    created = sum(1 for result in results if result["status"] == "created")
+    skipped = sum(1 for result in results if result["status"] == "skipped")
+    return jsonify({
+        "created": created,
+        "failed": len(results) - created - skipped,
+        "skipped": skipped,
+        "results": results,
+    }), 200
+
+
 @app.delete("/users/<int:user_id>")
 def delete_user(user_id):
     user = User.query.get(user_id)
@@ -211,6 +626,13 @@ def health():
 def admin_test(current_user):
     return jsonify(message=f"Halo admin {current_user.username}! Anda berhasil masuk.")
 
+@app.get("/admin/cache-stats")
+@admin_required
+def cache_stats(current_user):
+    """Statistik cache user di token_required dan pool hashing password (per proses)."""
+    return jsonify({"userCache": user_cache.stats(), "passwordPool": passwords.stats()})
+
+
 @app.get("/verify-admin")
 @token_required
 def verify_admin(current_user):
@@ -222,8 +644,10 @@ def verify_admin(current_user):
 # === Perintah CLI untuk Database ===
 @app.cli.command("init-db")
 def init_db_command():
-    """Membuat tabel database."""
+    """Membuat tabel database (dan index yang belum ada di database lama)."""
     db.create_all()
+    for index in User.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
     db.session.commit()
     print("Database diinisialisasi.")
     
@@ -236,13 +660,60 @@ def seed_admin_command():
         print(f"User {username} sudah ada.")
         return
 
-    password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+    password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
     admin_user = User(username=username, password_hash=password_hash, role='admin')
     db.session.add(admin_user)
     db.session.commit()
     print(f"User admin '{username}' berhasil dibuat dengan password '{password}'.")
 
 
+@app.cli.command("prune-refresh-tokens")
+def prune_refresh_tokens_command():
+    """Menghapus refresh token yang sudah kedaluwarsa."""
+    deleted = RefreshToken.query.filter(RefreshToken.expires_at <= datetime.utcnow()).delete()
+    db.session.commit()
+    print(f"{deleted} refresh token kedaluwarsa dihapus.")
+
+
+@app.cli.command("bench-login")
+@click.option("--requests", "total", default=200, help="Jumlah login per tingkat concurrency.")
+@click.option("--concurrency", default="1,2,4,8,16", help="Daftar concurrency, dipisah koma.")
+def bench_login_command(total, concurrency):
+    """Mengukur throughput /login pada beberapa tingkat concurrency."""
+    username, password = "bench-login-user", "bench-login-password"
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        user = User(username=username, role='user',
+                    password_hash=generate_password_hash(password, method=PASSWORD_HASH_METHOD))
+        db.session.add(user)
+        db.session.commit()
+
+    print(f"{total} login per baris, {passwords.PASSWORD_HASH_WORKERS} proses hash, "
+          f"{passwords.PASSWORD_HASH_ITERATIONS} iterasi pbkdf2")
+    print(f"{'concurrency':>12}{'login/s':>10}{'p50 (ms)':>10}{'p99 (ms)':>10}{'503':>6}")
+    try:
+        for level in [int(c) for c in concurrency.split(',') if c.strip()]:
+            latencies, statuses = [], []
+
+            def one(_):
+                started = time.perf_counter()
+                response = app.test_client().post("/login", json={"username": username, "password": password})
+                latencies.append(time.perf_counter() - started)
+                statuses.append(response.status_code)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=level) as executor:
+                list(executor.map(one, range(total)))
+            elapsed = time.perf_counter() - started
+
+            latencies.sort()
+            print(f"{level:>12}{total / elapsed:>10.1f}{latencies[len(latencies) // 2] * 1000:>10.1f}"
+                  f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:>10.1f}{statuses.count(503):>6}")
+    finally:
+        db.session.delete(user)
+        db.session.commit()
+
+
 # === Main execution ===
 if __name__ == "__main__":
     host = os.environ.get("FLASK_RUN_HOST", "0.0.0.0")
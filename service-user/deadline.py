@@ -0,0 +1,89 @@
+"""
+Deadline request dari API Gateway.
+
+Gateway mengirim header X-Request-Deadline (epoch dalam milidetik). Semua
+panggilan ke service lain memakai sisa waktu sampai deadline sebagai timeout
+dan meneruskan header yang sama, sehingga pekerjaan untuk request yang sudah
+ditinggalkan client dihentikan dengan 504.
+
+File ini identik di setiap service (build context Docker terpisah per service).
+"""
+import os
+import time
+
+import requests
+from flask import g, jsonify, request, has_request_context
+
+DEADLINE_HEADER = 'X-Request-Deadline'
+
+# Timeout panggilan antar service jika request tidak membawa deadline
+OUTBOUND_TIMEOUT = float(os.environ.get('OUTBOUND_TIMEOUT', 5.0))
+
+
+class DeadlineExceeded(Exception):
+    """Deadline request sudah lewat, pekerjaan tidak perlu dilanjutkan."""
+
+
+def _current_deadline():
+    if not has_request_context():
+        return None
+    return g.get('request_deadline')
+
+
+def time_left():
+    """Sisa detik sampai deadline request, atau None jika request tidak membawa deadline."""
+    deadline = _current_deadline()
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def remaining_timeout():
+    """
+    Timeout (detik) untuk panggilan keluar: sisa waktu sampai deadline,
+    maksimal OUTBOUND_TIMEOUT. Raise DeadlineExceeded jika sudah lewat.
+    """
+    deadline = _current_deadline()
+    if deadline is None:
+        return OUTBOUND_TIMEOUT
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise DeadlineExceeded()
+    return min(remaining, OUTBOUND_TIMEOUT)
+
+
+def outbound_get(url, headers=None):
+    """GET ke service lain dengan timeout = sisa deadline, header deadline ikut diteruskan."""
+    timeout = remaining_timeout()
+    headers = dict(headers or {})
+    deadline = _current_deadline()
+    if deadline is not None:
+        headers[DEADLINE_HEADER] = str(int(deadline * 1000))
+    try:
+        return requests.get(url, headers=headers, timeout=timeout)
+    except requests.exceptions.Timeout:
+        # Timeout karena deadline habis berbeda dengan service lain yang lambat
+        remaining_timeout()
+        raise
+
+
+def init_app(app):
+    """Daftarkan pemeriksaan deadline di awal request dan handler 504."""
+
+    @app.before_request
+    def check_request_deadline():
+        g.request_deadline = None
+        raw = request.headers.get(DEADLINE_HEADER)
+        if not raw:
+            return None
+        try:
+            g.request_deadline = int(raw) / 1000.0
+        except ValueError:
+            return None
+        if g.request_deadline <= time.time():
+            return jsonify({'error': 'Deadline request sudah lewat'}), 504
+        return None
+
+    @app.errorhandler(DeadlineExceeded)
+    def handle_deadline_exceeded(error):
+        return jsonify({'error': 'Deadline request sudah lewat'}), 504
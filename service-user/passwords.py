@@ -0,0 +1,141 @@
+"""
+Hashing password di process pool terpisah.
+
+pbkdf2 sengaja dibuat mahal. Jika dijalankan langsung di worker request,
+lonjakan login menghabiskan CPU semua worker dan request ringan seperti
+/verify-admin ikut menunggu. Di sini hashing dikirim ke ProcessPoolExecutor
+berukuran tetap. Jumlah pekerjaan yang boleh antre dibatasi; jika penuh,
+PasswordPoolBusy langsung di-raise agar endpoint bisa membalas 503.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+# Biaya hash: jumlah iterasi pbkdf2 untuk hash baru. Hash lama tetap bisa
+# diverifikasi karena jumlah iterasinya tersimpan di dalam hash.
+PASSWORD_HASH_ITERATIONS = int(os.environ.get("PASSWORD_HASH_ITERATIONS", DEFAULT_PBKDF2_ITERATIONS))
+PASSWORD_HASH_METHOD = f"pbkdf2:sha256:{PASSWORD_HASH_ITERATIONS}"
+
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+# Maksimal pekerjaan hash yang sedang berjalan + antre di pool
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get("PASSWORD_HASH_QUEUE_LIMIT", PASSWORD_HASH_WORKERS * 4))
+# Batas waktu menunggu hasil hash (detik)
+PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", 10))
+
+
+class PasswordPoolBusy(Exception):
+    """Antrean hashing penuh, request sebaiknya ditolak cepat."""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_QUEUE_LIMIT)
+_stats = {"submitted": 0, "rejected": 0}
+_stats_lock = threading.Lock()
+
+
+def _get_pool():
+    """Pool dibuat saat pertama kali dipakai, yaitu setelah fork worker gunicorn."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        return _pool
+
+
+def _acquire_slot():
+    if not _slots.acquire(blocking=False):
+        with _stats_lock:
+            _stats["rejected"] += 1
+        raise PasswordPoolBusy()
+
+
+def _submit(jobs):
+    """
+    Kirim beberapa pekerjaan ke pool dengan satu slot antrean. Slot baru
+    dilepas setelah semua pekerjaannya selesai di pool, bukan saat pemanggil
+    berhenti menunggu, agar pekerjaan yang timeout tetap terhitung antre.
+    """
+    _acquire_slot()
+    remaining = [len(jobs)]
+    remaining_lock = threading.Lock()
+
+    def done(_future):
+        with remaining_lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            _slots.release()
+
+    futures = []
+    try:
+        pool = _get_pool()
+        for fn, args in jobs:
+            futures.append(pool.submit(fn, *args))
+    except Exception:
+        # Pekerjaan yang tidak sempat dikirim tidak akan memanggil done()
+        for _ in range(len(jobs) - len(futures)):
+            done(None)
+        raise
+    finally:
+        for future in futures:
+            future.add_done_callback(done)
+    with _stats_lock:
+        _stats["submitted"] += len(jobs)
+    return futures
+
+
+def _results(futures):
+    try:
+        return [future.result(timeout=PASSWORD_HASH_TIMEOUT) for future in futures]
+    except TimeoutError:
+        # Pool tertinggal jauh; perlakukan sama dengan antrean penuh
+        raise PasswordPoolBusy()
+
+
+def _run(fn, *args):
+    return _results(_submit([(fn, args)]))[0]
+
+
+def _generate(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def hash_password(password):
+    """Hash password baru dengan biaya PASSWORD_HASH_ITERATIONS."""
+    return _run(_generate, password, PASSWORD_HASH_METHOD)
+
+
+def verify_password(password_hash, password):
+    """Cocokkan password dengan hash yang tersimpan."""
+    return _run(check_password_hash, password_hash, password)
+
+
+def hash_password_waves(passwords):
+    """
+    Hash banyak password sekaligus, tersebar ke semua proses pool. Dikirim
+    per gelombang sebesar jumlah proses agar hash untuk login yang datang
+    bersamaan tidak menunggu seluruh batch selesai. Setiap gelombang memakai
+    satu slot antrean. Generator: hash di-yield per gelombang, sehingga
+    pemanggil bisa berhenti di antara gelombang (misal deadline hampir habis).
+    """
+    for start in range(0, len(passwords), PASSWORD_HASH_WORKERS):
+        wave = passwords[start:start + PASSWORD_HASH_WORKERS]
+        yield _results(_submit([(_generate, (password, PASSWORD_HASH_METHOD)) for password in wave]))
+
+
+def hash_passwords(passwords):
+    """Seperti hash_password_waves, tetapi menunggu semua gelombang selesai."""
+    return [password_hash for wave in hash_password_waves(passwords) for password_hash in wave]
+
+
+def stats():
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "queueLimit": PASSWORD_HASH_QUEUE_LIMIT,
+        "iterations": PASSWORD_HASH_ITERATIONS,
+        "submitted": _stats["submitted"],
+        "rejected": _stats["rejected"],
+    }